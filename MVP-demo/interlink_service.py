@@ -1,4 +1,6 @@
+import os
 import re
+import sys
 import spacy
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
@@ -6,6 +8,14 @@ import logging
 from typing import List, Dict, Set, Tuple, Optional
 import unicodedata
 
+# Share the overlap selection and parser setup with the main linker in the
+# repository root; appended so the demo's own modules are still found first
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+from span_index import SpanSet, select_non_overlapping
+from html_parsers import DEFAULT_PARSER, parse_html, resolve_parser
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,13 +26,15 @@ class InterlinkService:
     a provided list of target pages and their associated terms.
     """
     
-    def __init__(self, nlp_model: str = "en_core_web_sm"):
+    def __init__(self, nlp_model: str = "en_core_web_sm", parser: str = DEFAULT_PARSER):
         """
         Initialize the InterlinkService with spaCy NLP model.
         
         Args:
             nlp_model: spaCy model name to use for tokenization and lemmatization
+            parser: BeautifulSoup parser backend ('html.parser' or 'lxml')
         """
+        self.parser = resolve_parser(parser)
         try:
             self.nlp = spacy.load(nlp_model)
             logger.info(f"Loaded spaCy model: {nlp_model}")
@@ -247,6 +259,7 @@ class InterlinkService:
         # Sort phrases by length (longest first) to prioritize longer matches
         sorted_phrases = sorted(prepared_phrases, key=lambda x: -x['length'])
         
+        occupied = SpanSet()
         for phrase in sorted_phrases:
             if phrase['original'] in used_terms:
                 continue
@@ -258,13 +271,8 @@ class InterlinkService:
                     end_char = doc[i+n-1].idx + len(doc[i+n-1])
                     
                     # Check if this match overlaps with any existing match
-                    overlaps = False
-                    for existing_match in matches:
-                        if (start_char < existing_match['end'] and end_char > existing_match['start']):
-                            overlaps = True
-                            break
-                    
-                    if not overlaps:
+                    if not occupied.overlaps(start_char, end_char):
+                        occupied.add(start_char, end_char)
                         matches.append({
                             'start': start_char,
                             'end': end_char,
@@ -280,26 +288,13 @@ class InterlinkService:
         Given a list of matches (with start, end, length), select the maximal set of non-overlapping matches,
         preferring longer matches and earlier positions.
         """
-        # Sort by -length, start (longest matches first, then earliest position)
-        matches = sorted(matches, key=lambda m: (-m['length'], m['start']))
-        selected = []
-        occupied = set()
-        
-        for m in matches:
-            rng = set(range(m['start'], m['end']))
-            if occupied & rng:
-                continue
-            selected.append(m)
-            occupied.update(rng)
-        
-        # Sort back by start position for replacement
-        selected.sort(key=lambda m: m['start'])
-        return selected
+        # Longest matches first, then earliest position; sorted back by start for replacement
+        return select_non_overlapping(matches)
 
     def process_html(self, html_content: str, target_entries: List[Dict], current_page_url: str = "") -> str:
         if not html_content or not target_entries:
             return html_content
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content, self.parser)
         # Extract terms from target URLs
         target_terms_map = {}
         for entry in target_entries:
@@ -373,7 +368,7 @@ class InterlinkService:
             return html_content
         
         # Parse HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content, self.parser)
         
         # Create target terms map
         target_terms_map = {}
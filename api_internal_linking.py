@@ -3,30 +3,90 @@
 FastAPI-based API for Enhanced Internal Linking System
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
-from typing import List, Dict, Optional
-import uvicorn
-import tempfile
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.datastructures import UploadFile
+from starlette.types import Receive, Scope, Send
+from typing import Any, List, Dict, Literal, Optional, Tuple, Union, AsyncIterator, BinaryIO
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
-from enhanced_internal_linking import EnhancedInternalLinker
+import secrets
+import tarfile
+import zipfile
+import uvicorn
+from enhanced_internal_linking import EnhancedInternalLinker, LinkingResult
+from glossary_reload import MAX_INDEX_DELTA, GlossaryReloader, GlossaryReloadError
+from glossary_store import GlossaryEntryNotFoundError, add_alias, put_entry, remove_alias, remove_entry
+from html_parsers import DEFAULT_PARSER
+from linking_executor import LinkingExecutor, ExecutorBusyError
+from result_cache import ResultCache
+
+# Linking runs on a bounded worker pool so the event loop stays responsive. The
+# linker and its pool form the snapshot requests use; a glossary reload swaps in
+# a new one while requests in flight finish on the old one. Built at startup by
+# lifespan, so that worker processes, which import this module, do not build one.
+reloader: Optional[GlossaryReloader] = None
+
+def create_reloader() -> GlossaryReloader:
+    """Build the linker, its worker pool and the glossary reloader configured by the environment"""
+    return GlossaryReloader(
+        LinkingExecutor.from_env(EnhancedInternalLinker(parser=os.environ.get('LINKER_HTML_PARSER', DEFAULT_PARSER))),
+        poll_interval=float(os.environ.get('LINKER_RELOAD_INTERVAL', 0)),
+        max_index_delta=int(os.environ.get('LINKER_MAX_INDEX_DELTA', MAX_INDEX_DELTA)),
+        result_cache=result_cache
+    )
+
+# Token required by /admin endpoints in the X-Admin-Token header; without it they are disabled
+ADMIN_TOKEN = os.environ.get('LINKER_ADMIN_TOKEN')
+
+# Results of repeated requests (preview, save, publish) are served from memory
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('LINKER_CACHE_ENTRIES', 1024)),
+    max_bytes=int(os.environ.get('LINKER_CACHE_MB', 64)) * 1024 * 1024
+)
+
+# Maximum number of articles accepted by /process/batch
+MAX_BATCH_ITEMS = int(os.environ.get('LINKER_MAX_BATCH_ITEMS', 500))
+
+# Limits for /upload: total request size, and number of files including archive members
+MAX_UPLOAD_BYTES = int(os.environ.get('LINKER_MAX_UPLOAD_MB', 50)) * 1024 * 1024
+MAX_UPLOAD_FILES = int(os.environ.get('LINKER_MAX_UPLOAD_FILES', 500))
+
+# Uploads unpacked into their member articles
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+# Request bodies taken as the article itself rather than a JSON ArticleRequest
+RAW_MEDIA_TYPES = ('text/html', 'application/octet-stream')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global reloader
+    reloader = create_reloader()
+    await reloader.current.warm_up()
+    reloader.install_signal_handler()
+    reloader.start_polling()
+    yield
+    await reloader.stop()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Enhanced Internal Linking API",
     description="API for intelligent internal linking of financial articles using AI-powered glossary",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Initialize the linker
-linker = EnhancedInternalLinker()
-
 # Pydantic models for request/response
 class ArticleRequest(BaseModel):
     content: str
     max_links: Optional[int] = 12
     current_url: Optional[str] = None
+    response_mode: Literal["html", "patch"] = "html"
 
 class ArticleResponse(BaseModel):
     html_content: str
@@ -36,17 +96,412 @@ class ArticleResponse(BaseModel):
     max_links: int
     current_url: Optional[str] = None
 
+class ArticleStreamSummary(BaseModel):
+    total_links: int
+    existing_links: int
+    new_links_added: int
+    max_links: int
+    current_url: Optional[str] = None
+
+class LinkInsertion(BaseModel):
+    offset: int
+    length: int
+    text: str
+    url: str
+    term: str
+    category: str
+
+class ArticlePatchResponse(BaseModel):
+    insertions: List[LinkInsertion]
+    total_links: int
+    existing_links: int
+    new_links_added: int
+    max_links: int
+    current_url: Optional[str] = None
+
+class UploadFileResult(BaseModel):
+    filename: str
+    result: Optional[ArticleResponse] = None
+    error: Optional[str] = None
+
+class UploadResponse(BaseModel):
+    results: List[UploadFileResult]
+    succeeded: int
+    failed: int
+
+class BatchArticleRequest(BaseModel):
+    # Each item is validated as an ArticleRequest on its own, so one bad item does not fail the batch
+    items: List[Any]
+
+class BatchItemResult(BaseModel):
+    index: int
+    result: Optional[Union[ArticleResponse, ArticlePatchResponse]] = None
+    error: Optional[str] = None
+
+class BatchArticleResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+class StreamArticleRequest(ArticleRequest):
+    id: Optional[Union[str, int]] = None
+
 class ProcessingResult(BaseModel):
     article_file: str
     total_matches: int
     unique_terms: List[str]
     matches_by_category: Dict[str, List[Dict]]
 
+class GlossaryEntry(BaseModel):
+    term: str
+    url: str
+    aliases: List[str] = []
+    category: str = ""
+
+class AliasRequest(BaseModel):
+    url: str
+    alias: str
+
 class StatisticsResponse(BaseModel):
     total_terms: int
     total_aliases: int
     unique_urls: int
     categories: Dict[str, int]
+    glossary_version: str
+    cache: Optional[Dict] = None
+
+def cache_version(executor: LinkingExecutor) -> str:
+    """
+    Glossary version of the executor's results, for caching them.
+    
+    The reloader switches the cache to each glossary version it swaps in, so
+    requests that started before a reload neither read nor overwrite results for
+    the new glossary.
+    """
+    return executor.linker.glossary_version
+
+async def link_with_cache(executor: LinkingExecutor, content: str, max_links: int,
+                          current_url: Optional[str] = None) -> LinkingResult:
+    """Link article content on the worker pool, reusing the cached result of an identical request"""
+    version = cache_version(executor)
+    key = ResultCache.make_key('process', content, version, max_links=max_links, current_url=current_url)
+    result = result_cache.get(key, version)
+    if result is None:
+        result = await executor.link_html(content, max_links=max_links, current_url=current_url)
+        result_cache.put(key, result, len(result.html), version)
+    return result
+
+async def edits_with_cache(executor: LinkingExecutor, content: str, max_links: int,
+                           current_url: Optional[str] = None) -> LinkingResult:
+    """Find link insertions on the worker pool, reusing the cached result of an identical request"""
+    version = cache_version(executor)
+    key = ResultCache.make_key('patch', content, version, max_links=max_links, current_url=current_url)
+    result = result_cache.get(key, version)
+    if result is None:
+        result = await executor.find_link_edits(content, max_links=max_links, current_url=current_url)
+        result_cache.put(key, result, sum(len(edit.href) + len(edit.term) + 64 for edit in result.edits), version)
+    return result
+
+async def analyze_with_cache(executor: LinkingExecutor, content: str) -> Dict:
+    """Analyze article content on the worker pool, reusing the cached result of an identical request"""
+    version = cache_version(executor)
+    key = ResultCache.make_key('analyze', content, version)
+    result = result_cache.get(key, version)
+    if result is None:
+        result = await executor.analyze_html(content)
+        result_cache.put(key, result, len(json.dumps(result)), version)
+    return result
+
+def to_article_response(result: LinkingResult, max_links: int, current_url: Optional[str] = None) -> ArticleResponse:
+    """Build the API response for a linking result"""
+    return ArticleResponse(
+        html_content=result.html,
+        total_links=result.total_links,
+        existing_links=result.existing_links,
+        new_links_added=result.new_links_added,
+        max_links=max_links,
+        current_url=current_url
+    )
+
+def to_patch_response(linker: EnhancedInternalLinker, content: str, result: LinkingResult, max_links: int,
+                      current_url: Optional[str] = None) -> ArticlePatchResponse:
+    """Build the patch-only API response, listing each insertion against the submitted content"""
+    insertions = []
+    for edit in result.edits:
+        entry = linker.get_term_entry(edit.term)
+        insertions.append(LinkInsertion(
+            offset=edit.offset,
+            length=edit.length,
+            text=content[edit.offset:edit.end],
+            url=edit.href,
+            term=edit.term,
+            category=entry.get('category', 'unknown') if entry else 'unknown'
+        ))
+    return ArticlePatchResponse(
+        insertions=insertions,
+        total_links=result.total_links,
+        existing_links=result.existing_links,
+        new_links_added=result.new_links_added,
+        max_links=max_links,
+        current_url=current_url
+    )
+
+def describe_validation_error(e: ValidationError) -> str:
+    """Summarize why an article failed validation as `field: message` parts, for per-article error strings"""
+    parts = []
+    for error in e.errors(include_url=False):
+        field = '.'.join(str(part) for part in error['loc'])
+        parts.append(f"{field}: {error['msg']}" if field else error['msg'])
+    return f"Invalid article: {'; '.join(parts)}"
+
+async def process_article_request(executor: LinkingExecutor,
+                                  item: ArticleRequest) -> Union[ArticleResponse, ArticlePatchResponse]:
+    """Link one article and build the response for its response_mode"""
+    if item.response_mode == "patch":
+        result = await edits_with_cache(executor, item.content, item.max_links, item.current_url)
+        return to_patch_response(executor.linker, item.content, result, item.max_links, item.current_url)
+    result = await link_with_cache(executor, item.content, item.max_links, item.current_url)
+    return to_article_response(result, item.max_links, item.current_url)
+
+async def read_article_request(request: Request, **options) -> ArticleRequest:
+    """
+    Read the article of a /process, /process/stream or /analyze request.
+    
+    JSON bodies are parsed straight into an ArticleRequest. text/html and
+    application/octet-stream bodies are the article itself, decoded once, with the
+    other ArticleRequest fields taken from the query string or headers (`options`).
+    """
+    media_type, _, parameters = request.headers.get('content-type', '').partition(';')
+    raw = media_type.strip().lower() in RAW_MEDIA_TYPES
+    body = await request.body()
+    try:
+        if raw:
+            charset = 'utf-8'
+            for parameter in parameters.split(';'):
+                name, _, value = parameter.partition('=')
+                if name.strip().lower() == 'charset' and value.strip():
+                    charset = value.strip().strip('"')
+            item = ArticleRequest.model_validate({'content': '', **{name: value for name, value in options.items() if value is not None}})
+            # Assigned after validation so the article is not validated and copied again
+            item.content = body.decode(charset)
+            return item
+        return ArticleRequest.model_validate_json(body)
+    except ValidationError as e:
+        source = 'query' if raw else 'body'
+        raise RequestValidationError([{**error, 'loc': (source, *error['loc'])} for error in e.errors(include_url=False)])
+    except (UnicodeDecodeError, LookupError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode article: {str(e)}")
+
+# The request body is read by read_article_request, so it is described for the docs here
+ARTICLE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": ArticleRequest.model_json_schema()},
+            "text/html": {"schema": {"type": "string"}},
+            "application/octet-stream": {"schema": {"type": "string", "format": "binary"}}
+        }
+    }
+}
+
+def limit_request_body(request: Request, max_bytes: int) -> Request:
+    """
+    Wrap a request so that reading more than max_bytes of its body fails with 413.
+    
+    A Content-Length over the limit is rejected before any of the body is read.
+    """
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the limit of {max_bytes} bytes")
+    received = 0
+    
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds the limit of {max_bytes} bytes")
+        return message
+    
+    return Request(request.scope, receive)
+
+def is_archive(upload: UploadFile) -> bool:
+    """Check whether an uploaded file is a zip or tar archive of articles"""
+    name = (upload.filename or '').lower()
+    return name.endswith(ZIP_SUFFIXES) or name.endswith(TAR_SUFFIXES)
+
+def list_archive_articles(upload: UploadFile) -> List[Tuple[str, Optional[str], object]]:
+    """
+    List the article files of an uploaded zip or tar archive.
+    
+    Returns:
+        (filename, error, opener) for each regular file; opener returns a binary
+        file object for the member, error explains why a member is skipped
+    """
+    articles = []
+    name = (upload.filename or '').lower()
+    if name.endswith(ZIP_SUFFIXES):
+        archive = zipfile.ZipFile(upload.file)
+        members = [(info.filename, info.file_size, info) for info in archive.infolist() if not info.is_dir()]
+        open_member = archive.open
+    else:
+        archive = tarfile.open(fileobj=upload.file, mode='r:*')
+        members = [(info.name, info.size, info) for info in archive.getmembers() if info.isfile()]
+        open_member = archive.extractfile
+    for filename, size, info in members:
+        if os.path.basename(filename).startswith('.') or filename.startswith('__MACOSX/'):
+            continue
+        error = f"File exceeds the limit of {MAX_UPLOAD_BYTES} bytes" if size > MAX_UPLOAD_BYTES else None
+        articles.append((filename, error, lambda info=info: open_member(info)))
+    return articles
+
+async def link_uploaded_file(executor: LinkingExecutor, filename: str, file: BinaryIO,
+                             max_links: int) -> UploadFileResult:
+    """Stream one uploaded article through the linker on the worker pool"""
+    try:
+        result = await executor.link_file(file, max_links)
+        return UploadFileResult(filename=filename, result=to_article_response(result, max_links))
+    except ExecutorBusyError:
+        raise
+    except UnicodeDecodeError as e:
+        return UploadFileResult(filename=filename, error=f"File is not valid UTF-8: {str(e)}")
+    except Exception as e:
+        return UploadFileResult(filename=filename, error=f"Error processing uploaded file: {str(e)}")
+
+async def iter_ndjson_lines(receive: Receive) -> AsyncIterator[bytes]:
+    """Yield the non-empty lines of an NDJSON request body as its chunks arrive"""
+    buffer = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        buffer += message.get("body", b"")
+        more_body = message.get("more_body", False)
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def link_ndjson_line(executor: LinkingExecutor, line_number: int, line: bytes) -> str:
+    """Link one NDJSON article and return its NDJSON result line, keyed by the article id or line number"""
+    item_id = line_number
+    try:
+        item = StreamArticleRequest.model_validate_json(line)
+        if item.id is not None:
+            item_id = item.id
+        response = await process_article_request(executor, item)
+        return json.dumps({"id": item_id, "result": response.model_dump()}) + "\n"
+    except ValidationError as e:
+        return json.dumps({"id": item_id, "error": describe_validation_error(e)}) + "\n"
+    except Exception as e:
+        return json.dumps({"id": item_id, "error": f"Error processing article: {str(e)}"}) + "\n"
+
+async def stream_ndjson_results(executor: LinkingExecutor, receive: Receive, window: int) -> AsyncIterator[str]:
+    """
+    Link NDJSON articles as they are read and yield each result line as soon as it is ready.
+    
+    At most `window` articles are in flight or waiting to be sent; reading the request
+    pauses until the client has consumed results, so memory stays bounded.
+    """
+    slots = asyncio.Semaphore(window)
+    output: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+    
+    async def run_item(line_number: int, line: bytes):
+        await output.put(await link_ndjson_line(executor, line_number, line))
+    
+    async def read_items():
+        try:
+            line_number = 0
+            async for line in iter_ndjson_lines(receive):
+                await slots.acquire()
+                task = asyncio.create_task(run_item(line_number, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                line_number += 1
+            while tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            output.put_nowait(None)
+    
+    reader = asyncio.create_task(read_items())
+    try:
+        while True:
+            line = await output.get()
+            if line is None:
+                break
+            yield line
+            slots.release()
+        await reader
+    finally:
+        reader.cancel()
+        for task in tasks:
+            task.cancel()
+
+async def stream_linked_blocks(linking: asyncio.Future, blocks: asyncio.Queue, max_links: int,
+                               current_url: Optional[str]) -> AsyncIterator[str]:
+    """
+    Yield an NDJSON line `{"html": ...}` for each linked block as the worker emits it,
+    then a `{"summary": ...}` line with the link counts, or an `{"error": ...}` line.
+    """
+    linking.add_done_callback(lambda _: blocks.put_nowait(None))
+    while True:
+        block = await blocks.get()
+        if block is None:
+            break
+        yield json.dumps({"html": block}) + "\n"
+    try:
+        result = linking.result()
+    except Exception as e:
+        yield json.dumps({"error": f"Error processing article: {str(e)}"}) + "\n"
+        return
+    summary = ArticleStreamSummary(
+        total_links=result.total_links,
+        existing_links=result.existing_links,
+        new_links_added=result.new_links_added,
+        max_links=max_links,
+        current_url=current_url
+    )
+    yield json.dumps({"summary": summary.model_dump()}) + "\n"
+
+class LeasedStreamingResponse(StreamingResponse):
+    """
+    Streams a response produced on an executor while holding the executor's lease.
+    
+    The lease is released when the response is finished or the client goes away,
+    so a glossary reload does not retire the snapshot while it is still streaming.
+    """
+    
+    def __init__(self, executor: LinkingExecutor, content: AsyncIterator[str], **kwargs):
+        super().__init__(content=content, **kwargs)
+        self.executor = executor
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.executor.release()
+
+class NDJSONStreamResponse(StreamingResponse):
+    """
+    Streams NDJSON results while the NDJSON request body is still being read.
+    
+    The request body is consumed inside the response, so results for early articles
+    are sent before the client has finished uploading the rest. The whole stream is
+    linked with the glossary snapshot current when it started.
+    """
+    
+    def __init__(self):
+        super().__init__(content=(), media_type="application/x-ndjson")
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        async with reloader.snapshot() as executor:
+            self.body_iterator = stream_ndjson_results(executor, receive, executor.max_workers * 2)
+            await self.stream_response(send)
 
 @app.get("/")
 async def root():
@@ -58,9 +513,15 @@ async def root():
             "/docs": "API documentation",
             "/stats": "Get glossary statistics",
             "/process": "Process article content",
-            "/upload": "Upload and process article file",
+            "/process/stream": "Process article content, streaming the linked HTML block by block",
+            "/process/batch": "Process several articles in one request",
+            "/process/batch/stream": "Process NDJSON articles, streaming NDJSON results",
+            "/upload": "Upload and process article files or a zip/tar archive",
             "/categories": "Get all categories",
-            "/terms/{category}": "Get terms by category"
+            "/terms/{category}": "Get terms by category",
+            "/admin/reload": "Reload the glossary file without restarting",
+            "/admin/terms": "Add, update or remove a glossary entry",
+            "/admin/terms/aliases": "Add or remove an alias of a glossary entry"
         }
     }
 
@@ -68,8 +529,9 @@ async def root():
 async def get_statistics():
     """Get glossary statistics"""
     try:
+        linker = reloader.linker
         stats = linker.get_statistics()
-        return StatisticsResponse(**stats)
+        return StatisticsResponse(**stats, glossary_version=linker.glossary_version, cache=result_cache.get_statistics())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
 
@@ -77,7 +539,7 @@ async def get_statistics():
 async def get_categories():
     """Get all available categories"""
     try:
-        categories = linker.get_categories()
+        categories = reloader.linker.get_categories()
         return {"categories": categories, "count": len(categories)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting categories: {str(e)}")
@@ -86,7 +548,7 @@ async def get_categories():
 async def get_terms_by_category(category: str):
     """Get all terms in a specific category"""
     try:
-        terms = linker.get_terms_by_category(category)
+        terms = reloader.linker.get_terms_by_category(category)
         return {
             "category": category,
             "terms": terms,
@@ -95,134 +557,289 @@ async def get_terms_by_category(category: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting terms: {str(e)}")
 
-@app.post("/process", response_model=ArticleResponse)
-async def process_article(request: ArticleRequest):
-    """Process article content and return HTML with internal links"""
+@app.post("/process", response_model=Union[ArticleResponse, ArticlePatchResponse], openapi_extra=ARTICLE_REQUEST_BODY)
+async def process_article(
+    request: Request,
+    max_links: Optional[int] = Query(None, description="Link limit for text/html bodies"),
+    current_url: Optional[str] = Query(None, description="Article URL for text/html bodies"),
+    response_mode: Optional[Literal["html", "patch"]] = Query(None, description="Response mode for text/html bodies"),
+    x_max_links: Optional[int] = Header(None),
+    x_current_url: Optional[str] = Header(None)
+):
+    """
+    Process article content and return HTML with internal links.
+    
+    The body is a JSON ArticleRequest, or the article itself as text/html or
+    application/octet-stream with the options in the query string or
+    X-Max-Links / X-Current-URL headers.
+    
+    With response_mode "patch" only the link insertions are returned, as character
+    offsets into the submitted content, instead of the rewritten HTML.
+    """
+    item = await read_article_request(
+        request,
+        max_links=max_links if max_links is not None else x_max_links,
+        current_url=current_url or x_current_url,
+        response_mode=response_mode
+    )
     try:
-        # Create temporary file with content
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            # Add current_url if provided
-            if request.current_url:
-                f.write(f'{{current_url = "{request.current_url}"}}\n')
-            f.write(request.content)
-            temp_file = f.name
-        
-        try:
-            # Process the article
-            html_content = linker.create_html_links(temp_file, max_links=request.max_links)
-            
-            # Count links in the result
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            total_links = len(soup.find_all('a'))
-            
-            # Count existing vs new links more accurately
-            # Parse the original content without the current_url line
-            original_content = request.content
-            if request.current_url:
-                # Remove the current_url line if it was added
-                lines = original_content.split('\n')
-                if lines and lines[0].strip().startswith('{current_url'):
-                    original_content = '\n'.join(lines[1:])
-            
-            original_soup = BeautifulSoup(original_content, 'html.parser')
-            existing_links = len(original_soup.find_all('a'))
-            new_links_added = total_links - existing_links
-            
-            return ArticleResponse(
-                html_content=html_content,
-                total_links=total_links,
-                existing_links=existing_links,
-                new_links_added=new_links_added,
-                max_links=request.max_links,
-                current_url=request.current_url
-            )
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_file)
-            
+        async with reloader.snapshot() as executor:
+            return await process_article_request(executor, item)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing article: {str(e)}")
 
-@app.post("/upload", response_model=ArticleResponse)
-async def upload_and_process_article(
-    file: UploadFile = File(...),
-    max_links: int = 12
+@app.post("/process/stream", openapi_extra=ARTICLE_REQUEST_BODY)
+async def process_article_blocks(
+    request: Request,
+    max_links: Optional[int] = Query(None, description="Link limit for text/html bodies"),
+    current_url: Optional[str] = Query(None, description="Article URL for text/html bodies"),
+    x_max_links: Optional[int] = Header(None),
+    x_current_url: Optional[str] = Header(None)
 ):
-    """Upload and process an article file"""
+    """
+    Process article content and stream the linked HTML back as NDJSON.
+    
+    Takes the same bodies as /process. The output is cut before each block-level
+    element (paragraph, heading, list item, ...) and every block is sent as a line
+    `{"html": ...}` as soon as it is linked; joined, the blocks are the article with
+    the links inserted and everything else unchanged. The last line is
+    `{"summary": ...}` with the link counts, or `{"error": ...}` if linking failed.
+    """
+    item = await read_article_request(
+        request,
+        max_links=max_links if max_links is not None else x_max_links,
+        current_url=current_url or x_current_url
+    )
+    blocks: asyncio.Queue = asyncio.Queue()
+    # The lease is handed over to the response, which releases it once the stream is finished
+    executor = reloader.current
+    executor.acquire()
     try:
-        # Read file content
-        content = await file.read()
-        content_str = content.decode('utf-8')
+        linking = executor.start_link_blocks(item.content, blocks.put_nowait, item.max_links, item.current_url)
+    except ExecutorBusyError as e:
+        executor.release()
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception:
+        executor.release()
+        raise
+    return LeasedStreamingResponse(
+        executor,
+        stream_linked_blocks(linking, blocks, item.max_links, item.current_url),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/process/batch", response_model=BatchArticleResponse)
+async def process_article_batch(request: BatchArticleRequest):
+    """Process several articles in parallel on the worker pool, reporting errors per article"""
+    if len(request.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has {len(request.items)} articles, the limit is {MAX_BATCH_ITEMS}")
+    
+    async with reloader.snapshot() as executor:
+        # Keep at most one article per worker in flight so the batch does not fill the queue
+        slots = asyncio.Semaphore(executor.max_workers)
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            f.write(content_str)
-            temp_file = f.name
+        async def process_item(index: int, raw_item: Any) -> BatchItemResult:
+            try:
+                item = ArticleRequest.model_validate(raw_item)
+            except ValidationError as e:
+                return BatchItemResult(index=index, error=describe_validation_error(e))
+            async with slots:
+                try:
+                    return BatchItemResult(index=index, result=await process_article_request(executor, item))
+                except Exception as e:
+                    return BatchItemResult(index=index, error=f"Error processing article: {str(e)}")
         
-        try:
-            # Process the article
-            html_content = linker.create_html_links(temp_file, max_links=max_links)
-            
-            # Count links
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            total_links = len(soup.find_all('a'))
-            
-            original_soup = BeautifulSoup(content_str, 'html.parser')
-            existing_links = len(original_soup.find_all('a'))
-            new_links_added = total_links - existing_links
-            
-            return ArticleResponse(
-                html_content=html_content,
-                total_links=total_links,
-                existing_links=existing_links,
-                new_links_added=new_links_added,
-                max_links=max_links
-            )
-        finally:
-            os.unlink(temp_file)
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing uploaded file: {str(e)}")
+        results = await asyncio.gather(*[process_item(index, item) for index, item in enumerate(request.items)])
+    failed = sum(1 for item_result in results if item_result.error is not None)
+    return BatchArticleResponse(results=results, succeeded=len(results) - failed, failed=failed)
 
-@app.post("/analyze")
-async def analyze_article(request: ArticleRequest):
-    """Analyze article content without creating HTML links"""
+@app.post("/process/batch/stream")
+async def process_article_stream():
+    """
+    Process a stream of NDJSON articles (one ArticleRequest per line, with an optional `id`).
+    
+    Results are streamed back as NDJSON lines `{"id": ..., "result": ...}` or
+    `{"id": ..., "error": ...}` in completion order; `id` defaults to the line number.
+    """
+    return NDJSONStreamResponse()
+
+# The multipart body is parsed by the endpoint itself, so it is described for the docs here
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "file": {"type": "array", "items": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+}
+
+@app.post("/upload", response_model=Union[ArticleResponse, UploadResponse], openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_and_process_article(
+    request: Request,
+    max_links: int = 12
+):
+    """
+    Upload and process article files.
+    
+    Files are streamed to spooled temporary files as they arrive and then streamed
+    through the linker in chunks; uploads over LINKER_MAX_UPLOAD_MB are rejected
+    with 413 as soon as the limit is passed. A single article file returns an
+    ArticleResponse. Several files, or a zip/tar archive of articles, return an
+    UploadResponse with a result or error per file.
+    """
+    form = await limit_request_body(request, MAX_UPLOAD_BYTES).form(max_files=MAX_UPLOAD_FILES)
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as f:
-            if request.current_url:
-                f.write(f'{{current_url = "{request.current_url}"}}\n')
-            f.write(request.content)
-            temp_file = f.name
-        
+        async with reloader.snapshot() as executor:
+            return await link_uploads(executor, form, max_links)
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        await form.close()
+
+async def link_uploads(executor: LinkingExecutor, form, max_links: int) -> Union[ArticleResponse, UploadResponse]:
+    """Link every article file of an /upload form, unpacking archives"""
+    uploads = [value for _, value in form.multi_items() if isinstance(value, UploadFile)]
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No article files in upload")
+    
+    if len(uploads) == 1 and not is_archive(uploads[0]):
+        # Single article: keep the original response format
+        item = await link_uploaded_file(executor, uploads[0].filename or '', uploads[0].file, max_links)
+        if item.error:
+            raise HTTPException(status_code=500, detail=item.error)
+        return item.result
+    
+    results = []
+    for upload in uploads:
+        if not is_archive(upload):
+            results.append(await link_uploaded_file(executor, upload.filename or '', upload.file, max_links))
+            continue
         try:
-            # Analyze the article
-            result = linker.process_article(temp_file)
-            # Convert to the expected format
-            return {
-                "article_file": result.get('article_file', ''),
-                "total_matches": result.get('total_matches', 0),
-                "unique_terms": result.get('unique_terms', []),
-                "matches_by_category": result.get('matches_by_category', {})
-            }
-        finally:
-            os.unlink(temp_file)
-            
+            articles = await asyncio.to_thread(list_archive_articles, upload)
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            results.append(UploadFileResult(filename=upload.filename or '', error=f"Invalid archive: {str(e)}"))
+            continue
+        if len(results) + len(articles) > MAX_UPLOAD_FILES:
+            raise HTTPException(status_code=413, detail=f"Upload has more than {MAX_UPLOAD_FILES} files")
+        for filename, error, open_member in articles:
+            if error:
+                results.append(UploadFileResult(filename=filename, error=error))
+                continue
+            # Opening a member seeks and reads archive headers, so it is kept off the event loop
+            member = await asyncio.to_thread(open_member)
+            try:
+                results.append(await link_uploaded_file(executor, filename, member, max_links))
+            finally:
+                member.close()
+    
+    failed = sum(1 for item in results if item.error is not None)
+    return UploadResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+@app.post("/analyze", openapi_extra=ARTICLE_REQUEST_BODY)
+async def analyze_article(request: Request):
+    """Analyze article content without creating HTML links; accepts the same bodies as /process"""
+    item = await read_article_request(request)
+    try:
+        async with reloader.snapshot() as executor:
+            result = await analyze_with_cache(executor, item.content)
+        return {
+            "article_file": "",
+            "total_matches": result['total_matches'],
+            "unique_terms": result['unique_terms'],
+            "matches_by_category": result['matches_by_category']
+        }
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing article: {str(e)}")
 
+def check_admin_token(x_admin_token: Optional[str]):
+    """Reject /admin requests unless LINKER_ADMIN_TOKEN is set and matches the X-Admin-Token header"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set LINKER_ADMIN_TOKEN to enable them")
+    if not secrets.compare_digest((x_admin_token or '').encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Missing or invalid admin token")
+
+@app.post("/admin/reload")
+async def reload_glossary(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Rebuild the linker from the glossary file and swap it in.
+    
+    Requests already running finish on the glossary they started with. The
+    X-Admin-Token header must match LINKER_ADMIN_TOKEN.
+    """
+    check_admin_token(x_admin_token)
+    try:
+        return await reloader.reload(force=force)
+    except GlossaryReloadError as e:
+        raise HTTPException(status_code=500, detail=f"Glossary reload failed: {str(e)}")
+
+async def edit_glossary(edit, x_admin_token: Optional[str]) -> Tuple[object, Dict]:
+    """Apply an edit to the glossary file and swap in the result, mapping edit errors to HTTP errors"""
+    check_admin_token(x_admin_token)
+    try:
+        return await reloader.edit_glossary(edit)
+    except GlossaryEntryNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GlossaryReloadError as e:
+        raise HTTPException(status_code=500, detail=f"Glossary reload failed: {str(e)}")
+
+@app.put("/admin/terms")
+async def put_glossary_entry(entry: GlossaryEntry, x_admin_token: Optional[str] = Header(None)):
+    """
+    Add a glossary entry, or replace the entries with the same URL.
+    
+    The glossary file is updated and the new glossary is in use when the response
+    is sent; only the changed terms are matched anew (see /admin/reload).
+    """
+    term_obj = entry.model_dump()
+    created, result = await edit_glossary(lambda terms: put_entry(terms, term_obj), x_admin_token)
+    return {"created": created, "entry": term_obj, **result}
+
+@app.delete("/admin/terms")
+async def delete_glossary_entry(url: str, x_admin_token: Optional[str] = Header(None)):
+    """Remove the glossary entries for a URL"""
+    removed, result = await edit_glossary(lambda terms: remove_entry(terms, url), x_admin_token)
+    return {"entries": removed, **result}
+
+@app.post("/admin/terms/aliases")
+async def add_glossary_alias(request: AliasRequest, x_admin_token: Optional[str] = Header(None)):
+    """Add an alias to the glossary entries for a URL"""
+    entries, result = await edit_glossary(lambda terms: add_alias(terms, request.url, request.alias),
+                                          x_admin_token)
+    return {"entries": entries, **result}
+
+@app.delete("/admin/terms/aliases")
+async def delete_glossary_alias(url: str, alias: str, x_admin_token: Optional[str] = Header(None)):
+    """Remove an alias from the glossary entries for a URL"""
+    entries, result = await edit_glossary(lambda terms: remove_alias(terms, url, alias), x_admin_token)
+    return {"entries": entries, **result}
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     try:
         # Test if the linker is working
-        stats = linker.get_statistics()
+        executor = reloader.current
+        stats = executor.linker.get_statistics()
         return {
             "status": "healthy",
             "glossary_loaded": stats['total_terms'] > 0,
-            "total_terms": stats['total_terms']
+            "total_terms": stats['total_terms'],
+            "glossary_version": executor.linker.glossary_version,
+            "reloads": reloader.reloads,
+            "workers": executor.get_statistics()
         }
     except Exception as e:
         return {
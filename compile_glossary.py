@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compile a JSON glossary into the binary index the linker loads at startup.
+
+Usage:
+    python compile_glossary.py [glossary_file] [-o index_file]
+
+An index compiled from an older version of the glossary is detected by the
+glossary's checksum. The linker then still uses its matcher, masking out the
+removed terms and matching the added ones with a small separate automaton, so
+recompiling is only needed once many terms have changed (the API does it
+itself after LINKER_MAX_INDEX_DELTA changed terms). Without a usable index the
+linker loads the JSON.
+"""
+
+import argparse
+import json
+import time
+
+from enhanced_internal_linking import EnhancedInternalLinker
+from glossary_index import file_sha256, glossary_index_path, write_glossary_index
+
+
+def compile_glossary(glossary_file: str = 'glossary_terms.json', index_file: str = None) -> str:
+    """
+    Compile a glossary into a binary index.
+
+    Args:
+        glossary_file: Path to the JSON glossary
+        index_file: Path of the index to write (defaults to the glossary path with an .idx suffix)
+
+    Returns:
+        Path of the written index
+
+    Raises:
+        FileNotFoundError: If the glossary does not exist
+        json.JSONDecodeError: If the glossary is not valid JSON
+    """
+    index_file = index_file or glossary_index_path(glossary_file)
+    source_sha256 = file_sha256(glossary_file)
+    with open(glossary_file, 'r', encoding='utf-8') as f:
+        json.load(f)
+
+    linker = EnhancedInternalLinker(glossary_file, use_index=False)
+    write_glossary_index(index_file, linker, source_sha256)
+    return index_file
+
+
+def main():
+    """Main function to compile the glossary."""
+    parser = argparse.ArgumentParser(description="Compile a JSON glossary into a binary index")
+    parser.add_argument('glossary_file', nargs='?', default='glossary_terms.json', help="JSON glossary to compile")
+    parser.add_argument('-o', '--output', help="Index file to write (default: glossary path with .idx suffix)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index_file = compile_glossary(args.glossary_file, args.output)
+    print(f"✅ Compiled {args.glossary_file} in {time.perf_counter() - start:.2f}s")
+    print(f"📁 Saved to: {index_file}")
+
+    start = time.perf_counter()
+    linker = EnhancedInternalLinker(args.glossary_file)
+    print(f"⚡ Linker starts in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"({len(linker.glossary_terms)} terms, glossary version {linker.glossary_version})")
+
+
+if __name__ == "__main__":
+    main()
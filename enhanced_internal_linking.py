@@ -3,45 +3,130 @@
 Enhanced Internal Linking Service that uses enriched glossary terms with aliases and categories.
 """
 
+import codecs
 import json
-import spacy
+import hashlib
 import re
-from bs4 import BeautifulSoup
+from bisect import bisect_right
+from dataclasses import dataclass
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
 from urllib.parse import urlparse
-from typing import List, Dict, Tuple, Set, Optional
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Dict, Tuple, Set, Optional
 import logging
+from term_matcher import AhoCorasickMatcher, LayeredTermMatcher, TermTable
+from span_index import SpanIndex, select_non_overlapping
+from html_parsers import DEFAULT_PARSER, parse_html, resolve_parser
+from html_rewriter import EXCLUDED_TAGS, LinkEdit, StreamingLinkRewriter, apply_link_edits, count_links
+from glossary_index import GlossaryIndex, glossary_index_path, load_glossary_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass
+class LinkingResult:
+    """
+    Linked HTML together with the link counts of the document.
+    
+    html is None when the output was streamed to a file instead. edits lists the
+    inserted links as offsets into the input when they were requested.
+    """
+    html: Optional[str]
+    existing_links: int
+    new_links_added: int
+    edits: Optional[List[LinkEdit]] = None
+    
+    @property
+    def total_links(self) -> int:
+        return self.existing_links + self.new_links_added
+
 class EnhancedInternalLinker:
     """
     Enhanced internal linker that uses enriched glossary terms with aliases and categories.
     """
     
-    def __init__(self, glossary_file: str = 'glossary_terms.json', nlp_model: str = "en_core_web_sm"):
+    # Joins text nodes for whole-document matching; never part of a glossary term
+    NODE_SEPARATOR = '\x00'
+    
+    # link_html output modes: re-serialise the parsed tree, or patch links into the source
+    OUTPUT_MODES = ('tree', 'patch')
+    
+    # Read size used when streaming article files
+    STREAM_CHUNK_SIZE = 64 * 1024
+    
+    # Opening <a> tag, with quoted attribute values that may contain '>' or '<a'
+    ANCHOR_OPEN_TAG = re.compile(r'''<a(?=[\s>/])(?:[^>"']|"[^"]*"|'[^']*')*>''', re.IGNORECASE)
+    
+    # Closing </a> tag, not </abbr>, </address> or </aside>
+    ANCHOR_CLOSE_TAG = re.compile(r'</a\s*>', re.IGNORECASE)
+    
+    # {current_url = "..."} line at the start of an article, naming the article's own URL
+    CURRENT_URL_DIRECTIVE = re.compile(r'\s*\{current_url\s*=\s*"([^"]+)"\}\s*')
+    
+    def __init__(self, glossary_file: str = 'glossary_terms.json', nlp_model: str = "en_core_web_sm",
+                 parser: str = DEFAULT_PARSER, use_index: bool = True, index_file: Optional[str] = None,
+                 glossary_terms: Optional[List[Dict]] = None):
         """
         Initialize the EnhancedInternalLinker.
         
         Args:
             glossary_file: Path to the JSON file containing enriched glossary terms
             nlp_model: spaCy model name to use
+            parser: BeautifulSoup parser backend ('html.parser' or 'lxml')
+            use_index: Map the glossary's compiled index (see compile_glossary.py) when one
+                is up to date, instead of parsing the JSON and building the matcher. An
+                index of an earlier version of the glossary still provides the matcher
+                for the terms it has in common with the JSON.
+            index_file: Path of the compiled index (defaults to the glossary path with an .idx suffix)
+            glossary_terms: Entries of glossary_file already read by the caller, used
+                instead of reading the file again
         """
         self.glossary_file = glossary_file
         self.nlp_model = nlp_model
-        self.glossary_terms = self._load_glossary_terms()
-        self.term_to_url_map = self._create_term_mapping()
-        
-        # Load spaCy model with fallback
-        self.nlp = None
-        try:
-            self.nlp = spacy.load(nlp_model)
-            logger.info(f"Loaded spaCy model: {nlp_model}")
-        except OSError:
-            logger.warning(f"spaCy model {nlp_model} not found. Using basic text processing.")
-        except Exception as e:
-            logger.warning(f"Error loading spaCy model: {e}. Using basic text processing.")
+        self.parser = resolve_parser(parser)
+        self.index_file = index_file or glossary_index_path(glossary_file)
+        index = load_glossary_index(self.index_file, glossary_file, allow_stale=True) if use_index else None
+        # Terms added to or removed from the glossary since the index was compiled;
+        # None when no index is used
+        self.index_delta: Optional[int] = None
+        if index is not None and index.is_current:
+            # Tables of the index are used in place, shared with other processes mapping it
+            self.glossary_terms = index.glossary_terms
+            self.glossary_version = index.glossary_version
+            self.term_to_url_map = index.term_to_url_map
+            self.term_entries = index.term_entries
+            self.terms_by_category = index.terms_by_category
+            self.term_table = index.term_table
+            self.term_matcher = index.term_matcher
+            self.index_delta = 0
+        else:
+            self.glossary_terms = self._load_glossary_terms() if glossary_terms is None else glossary_terms
+            self.glossary_version = self._compute_glossary_version()
+            self.term_to_url_map = self._create_term_mapping()
+            self.term_entries = self._create_term_entries()
+            self.terms_by_category = self._group_terms_by_category()
+            self._build_term_index(index)
+        self._statistics: Optional[Dict] = None
+        self._nlp = None
+        self._nlp_loaded = False
+    
+    @property
+    def nlp(self):
+        """
+        spaCy pipeline, loaded on first use; None if the model is not available.
+        """
+        if not self._nlp_loaded:
+            self._nlp_loaded = True
+            try:
+                import spacy
+                self._nlp = spacy.load(self.nlp_model)
+                logger.info(f"Loaded spaCy model: {self.nlp_model}")
+            except OSError:
+                logger.warning(f"spaCy model {self.nlp_model} not found. Using basic text processing.")
+            except Exception as e:
+                logger.warning(f"Error loading spaCy model: {e}. Using basic text processing.")
+        return self._nlp
         
     def _load_glossary_terms(self) -> List[Dict]:
         """
@@ -62,6 +147,16 @@ class EnhancedInternalLinker:
             logger.error(f"Error parsing JSON file: {e}")
             return []
     
+    def _compute_glossary_version(self) -> str:
+        """
+        Compute a short content hash identifying the loaded glossary.
+        
+        Returns:
+            Hex digest that changes whenever any term, alias, URL or category changes
+        """
+        canonical = json.dumps(self.glossary_terms, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+    
     def _create_term_mapping(self) -> Dict[str, str]:
         """
         Create a mapping from all aliases to their URLs.
@@ -80,6 +175,55 @@ class EnhancedInternalLinker:
                     term_map[alias.lower()] = url
         return term_map
     
+    def _create_term_entries(self) -> Dict[str, Dict]:
+        """
+        Create a reverse index from every term and alias to its glossary entry.
+        
+        When several entries share an alias, the first entry in the glossary wins.
+        
+        Returns:
+            Dictionary mapping lowercase terms/aliases to glossary term dictionaries
+        """
+        term_entries = {}
+        for term_obj in self.glossary_terms:
+            term_entries.setdefault(term_obj['term'].lower(), term_obj)
+            for alias in term_obj.get('aliases', []):
+                term_entries.setdefault(alias.lower(), term_obj)
+        return term_entries
+    
+    def _group_terms_by_category(self) -> Dict[str, List[Dict]]:
+        """
+        Group glossary entries by category, keeping glossary order.
+        
+        Returns:
+            Dictionary mapping category to its glossary term dictionaries
+        """
+        terms_by_category = {}
+        for term_obj in self.glossary_terms:
+            terms_by_category.setdefault(term_obj.get('category', ''), []).append(term_obj)
+        return terms_by_category
+    
+    def _build_term_index(self, base_index: Optional[GlossaryIndex] = None):
+        """
+        Build the length-ordered term table and the matcher over it.
+        
+        Only called when the glossary is (re)loaded; every request shares the result.
+        
+        Args:
+            base_index: Index compiled from an earlier version of the glossary, whose
+                matcher is reused so only the terms changed since need a new automaton
+        """
+        self.term_table = TermTable(self.term_to_url_map)
+        if base_index is None:
+            self.term_matcher = AhoCorasickMatcher(self.term_table.terms)
+            logger.info(f"Built term matcher with {self.term_matcher.state_count} states for {len(self.term_table)} terms")
+            return
+        
+        self.term_matcher = LayeredTermMatcher(self.term_table, base_index.term_matcher)
+        self.index_delta = self.term_matcher.added_terms + self.term_matcher.removed_terms
+        logger.info(f"Glossary index {self.index_file} is stale, matching with it plus "
+                    f"{self.term_matcher.added_terms} added and {self.term_matcher.removed_terms} removed terms")
+    
     def get_terms_by_category(self, category: str) -> List[Dict]:
         """
         Get all terms in a specific category.
@@ -90,7 +234,7 @@ class EnhancedInternalLinker:
         Returns:
             List of term objects in that category
         """
-        return [term for term in self.glossary_terms if term.get('category') == category]
+        return list(self.terms_by_category.get(category, []))
     
     def get_categories(self) -> List[str]:
         """
@@ -99,7 +243,7 @@ class EnhancedInternalLinker:
         Returns:
             List of unique categories
         """
-        return list(set(term.get('category', '') for term in self.glossary_terms))
+        return list(self.terms_by_category)
     
     def find_matches(self, text: str) -> List[Tuple[str, str, int, int]]:
         """
@@ -111,42 +255,13 @@ class EnhancedInternalLinker:
         Returns:
             List of (term, url, start, end) tuples with only one link per unique URL
         """
-        matches = []
-        text_lower = text.lower()
-        used_urls = set()  # Track which URLs have already been linked
-        
         # Parse HTML to find existing links
-        soup = BeautifulSoup(text, 'html.parser')
-        existing_link_positions = self._get_existing_link_positions(text, soup)
-        
-        # Sort terms by length (longest first) to avoid partial matches
-        sorted_terms = sorted(self.term_to_url_map.keys(), key=len, reverse=True)
-        
-        for term in sorted_terms:
-            url = self.term_to_url_map[term]
-            
-            # Skip if we've already linked this URL
-            if url in used_urls:
-                continue
-                
-            # Find all occurrences of the term
-            start = 0
-            while True:
-                start = text_lower.find(term, start)
-                if start == -1:
-                    break
-                
-                end = start + len(term)
-                
-                # Check if this is a complete word match and not within existing links
-                if self._is_complete_word_match(text, start, end) and not self._is_within_existing_links(start, end, existing_link_positions):
-                    matches.append((term, url, start, end))
-                    used_urls.add(url)  # Mark this URL as used
-                    break  # Only take the first occurrence of this term
-                
-                start = end
+        soup = parse_html(text, self.parser)
+        anchors, _ = self._collect_nodes(soup)
+        existing_link_positions = self._get_existing_link_positions(text, anchors)
         
-        return matches
+        # Only link each unique URL once
+        return self._select_term_matches(text, set(), existing_link_positions)
     
     def _find_matches_with_tracking(self, text: str, used_urls: set, max_matches: int = None, current_url: str = None) -> List[Tuple[str, str, int, int]]:
         """
@@ -161,37 +276,59 @@ class EnhancedInternalLinker:
         Returns:
             List of (term, url, start, end) tuples
         """
-        matches = []
-        text_lower = text.lower()
-        
         # Parse HTML to find existing links
-        soup = BeautifulSoup(text, 'html.parser')
-        existing_link_positions = self._get_existing_link_positions(text, soup)
+        soup = parse_html(text, self.parser)
+        anchors, _ = self._collect_nodes(soup)
+        existing_link_positions = self._get_existing_link_positions(text, anchors)
         
-        # Sort terms by length (longest first) to avoid partial matches
-        sorted_terms = sorted(self.term_to_url_map.keys(), key=len, reverse=True)
+        return self._select_term_matches(text, used_urls, existing_link_positions, max_matches, current_url)
+    
+    def _select_term_matches(self, text: str, used_urls: set, existing_link_positions: SpanIndex,
+                             max_matches: int = None, current_url: str = None,
+                             occurrences: Dict[int, List[int]] = None) -> List[Tuple[str, str, int, int]]:
+        """
+        Scan the text once with the term matcher and pick at most one match per URL.
         
-        for term in sorted_terms:
+        Terms are considered longest first. For each term the first occurrence that is
+        a complete word and not inside an existing link is taken.
+        
+        Args:
+            text: The text to search in
+            used_urls: Set of URLs that have already been used (updated in place)
+            existing_link_positions: Index of the (start, end) positions of existing links
+            max_matches: Maximum number of matches to return (None for unlimited)
+            current_url: The current URL to exclude from linking (for self-linking)
+            occurrences: Term occurrences already found in this text (scanned if None)
+            
+        Returns:
+            List of (term, url, start, end) tuples
+        """
+        matches = []
+        if occurrences is None:
+            occurrences = self.term_matcher.find_occurrences(text.lower())
+        term_table = self.term_table
+        
+        for term_index in sorted(occurrences):
             # Stop if we've reached the maximum matches
             if max_matches is not None and len(matches) >= max_matches:
                 break
-                
-            url = self.term_to_url_map[term]
+            
+            term = term_table.terms[term_index]
+            url = term_table.urls[term_index]
             
             # Skip if we've already linked this URL
             if url in used_urls:
                 continue
-                
+            
             # Skip if this is the current_url (self-link)
             if current_url and url.rstrip('/') == current_url.rstrip('/'):
                 continue
-                
-            # Find all occurrences of the term
-            start = 0
-            while True:
-                start = text_lower.find(term, start)
-                if start == -1:
-                    break
+            
+            # Occurrences overlapping a rejected one are skipped, as a left-to-right find would
+            next_start = 0
+            for start in occurrences[term_index]:
+                if start < next_start:
+                    continue
                 
                 end = start + len(term)
                 
@@ -201,10 +338,42 @@ class EnhancedInternalLinker:
                     used_urls.add(url)  # Mark this URL as used
                     break  # Only take the first occurrence of this term
                 
-                start = end
+                next_start = end
         
         return matches
     
+    def _find_document_occurrences(self, texts: List[str]) -> List[Dict[int, List[int]]]:
+        """
+        Scan several text nodes with a single matcher pass.
+        
+        The nodes are joined into one buffer with a separator no term contains, and
+        every occurrence is mapped back to its node. Occurrences that would cross a
+        node boundary are dropped.
+        
+        Args:
+            texts: Text of each node, in document order
+            
+        Returns:
+            For each node, a dictionary mapping term index to sorted start positions
+            relative to that node
+        """
+        lowered = [text.lower() for text in texts]
+        node_starts = []
+        offset = 0
+        for text in lowered:
+            node_starts.append(offset)
+            offset += len(text) + len(self.NODE_SEPARATOR)
+        
+        node_occurrences = [{} for _ in texts]
+        buffer = self.NODE_SEPARATOR.join(lowered)
+        for start, end, term_index in self.term_matcher.iter_matches(buffer):
+            node_index = bisect_right(node_starts, start) - 1
+            node_start = node_starts[node_index]
+            if end > node_start + len(lowered[node_index]):
+                continue
+            node_occurrences[node_index].setdefault(term_index, []).append(start - node_start)
+        return node_occurrences
+    
     def _is_complete_word_match(self, text: str, start: int, end: int) -> bool:
         """
         Check if the match is a complete word.
@@ -261,46 +430,86 @@ class EnhancedInternalLinker:
         
         return True
     
-    def _get_existing_link_positions(self, text: str, soup: BeautifulSoup) -> List[Tuple[int, int]]:
+    def _collect_nodes(self, soup: BeautifulSoup) -> Tuple[List[Tag], List[NavigableString]]:
+        """
+        Walk the parsed document once and collect its anchors and linkable text nodes.
+        
+        Args:
+            soup: BeautifulSoup parsed HTML
+            
+        Text inside anchors and the other excluded elements (scripts, styles, text
+        areas, titles) is skipped, as are comments, doctypes and CDATA sections,
+        so tree mode links the same text as the streaming rewriter.
+        
+        Returns:
+            Tuple of (anchor tags, linkable text nodes), both in document order
+        """
+        anchors = []
+        text_nodes = []
+        # Children are pushed in reverse so nodes are visited in document order
+        stack = [(child, False) for child in reversed(soup.contents)]
+        while stack:
+            node, excluded = stack.pop()
+            if isinstance(node, Tag):
+                if node.name == 'a':
+                    anchors.append(node)
+                if node.name in EXCLUDED_TAGS:
+                    excluded = True
+                stack.extend((child, excluded) for child in reversed(node.contents))
+            elif not excluded and not isinstance(node, PreformattedString):
+                text_nodes.append(node)
+        return anchors, text_nodes
+    
+    def _get_existing_link_positions(self, text: str, anchors: List[Tag]) -> SpanIndex:
         """
         Get positions of existing anchor tags in the text.
         
+        Each span runs from the anchor's opening tag to the end of its closing tag.
+        Start offsets come from the parser's source positions; anchors without one
+        are located by searching forward from the previous anchor.
+        
         Args:
             text: The original text
-            soup: BeautifulSoup parsed HTML
+            anchors: Anchor tags of the parsed text, in document order
             
         Returns:
-            List of (start, end) positions of existing links
+            Index of the (start, end) positions of existing links, built once per document
         """
         positions = []
-        for link in soup.find_all('a'):
-            # Get the text content of the link
-            link_text = link.get_text()
-            if link_text:
-                # Find the position of this link text in the original text
-                start = text.find(link_text)
-                if start != -1:
-                    end = start + len(link_text)
-                    positions.append((start, end))
-        return positions
-    
-    def _is_within_existing_links(self, start: int, end: int, existing_positions: List[Tuple[int, int]]) -> bool:
+        if not anchors:
+            return SpanIndex(positions)
+        
+        line_starts = [0]
+        line_starts.extend(match.end() for match in re.finditer('\n', text))
+        cursor = 0
+        for anchor in anchors:
+            if anchor.sourceline is not None and anchor.sourcepos is not None:
+                start = line_starts[anchor.sourceline - 1] + anchor.sourcepos
+            else:
+                # Resume after the previous opening tag so '<a' inside attribute values is skipped
+                open_tag = self.ANCHOR_OPEN_TAG.search(text, cursor)
+                if open_tag is None:
+                    break
+                start = open_tag.start()
+                cursor = open_tag.end()
+            close = self.ANCHOR_CLOSE_TAG.search(text, start)
+            end = len(text) if close is None else close.end()
+            positions.append((start, end))
+        return SpanIndex(positions)
+    
+    def _is_within_existing_links(self, start: int, end: int, existing_positions: SpanIndex) -> bool:
         """
         Check if the match position overlaps with any existing link.
         
         Args:
             start: Start position of match
             end: End position of match
-            existing_positions: List of (start, end) positions of existing links
+            existing_positions: Index of the (start, end) positions of existing links
             
         Returns:
             True if the match overlaps with an existing link
         """
-        for link_start, link_end in existing_positions:
-            # Check if there's any overlap
-            if (start < link_end and end > link_start):
-                return True
-        return False
+        return existing_positions.overlaps(start, end)
     
     def _is_within_any_html_tag(self, text: str, start: int, end: int) -> bool:
         """
@@ -344,6 +553,18 @@ class EnhancedInternalLinker:
             logger.error(f"Article file {article_file} not found")
             return {}
         
+        return {'article_file': article_file, **self.analyze_html(content)}
+    
+    def analyze_html(self, content: str) -> Dict:
+        """
+        Find internal linking opportunities in article content.
+        
+        Args:
+            content: Article text or HTML
+            
+        Returns:
+            Dictionary with total matches, matches grouped by category and unique terms
+        """
         matches = self.find_matches(content)
         
         # Group matches by category
@@ -362,7 +583,6 @@ class EnhancedInternalLinker:
             })
         
         return {
-            'article_file': article_file,
             'total_matches': len(matches),
             'matches_by_category': matches_by_category,
             'unique_terms': list(set(term for term, _, _, _ in matches))
@@ -378,45 +598,317 @@ class EnhancedInternalLinker:
         Returns:
             The category
         """
-        for term_obj in self.glossary_terms:
-            if term_obj['term'].lower() == term or term in [alias.lower() for alias in term_obj.get('aliases', [])]:
-                return term_obj.get('category', 'unknown')
-        return 'unknown'
+        term_obj = self.term_entries.get(term)
+        if term_obj is None:
+            return 'unknown'
+        return term_obj.get('category', 'unknown')
+    
+    def get_term_entry(self, term: str) -> Optional[Dict]:
+        """
+        Get the glossary entry (canonical term, URL, category and aliases) for a term or alias.
+        
+        Args:
+            term: The term or alias to look up (case-insensitive)
+            
+        Returns:
+            The glossary term dictionary, or None if the term is unknown
+        """
+        return self.term_entries.get(term.lower())
     
     def _extract_current_url(self, content: str) -> str:
         """
-        Extract the current_url from the article if present.
-        Returns the URL as a string, or None if not found.
+        Extract the current_url from a leading {current_url = "..."} line of the article.
+        Returns the URL as a string, or None if the article does not start with one.
         """
-        match = re.search(r'\{current_url\s*=\s*"([^"]+)"\}', content)
+        match = self.CURRENT_URL_DIRECTIVE.match(content)
         if match:
             return match.group(1).rstrip('/')
         return None
+    
+    def _strip_current_url_directive(self, content: str) -> str:
+        """
+        Remove a leading {current_url = "..."} line from the article, if present.
+        """
+        match = self.CURRENT_URL_DIRECTIVE.match(content)
+        if match:
+            return content[match.end():]
+        return content
 
-    def create_html_links(self, article_file: str, output_file: str = None, max_links: int = 12) -> str:
+    def create_html_links(self, article_file: str, output_file: str = None, max_links: int = 12,
+                          whole_document: bool = True, streaming: bool = False) -> LinkingResult:
         """
         Create HTML version with internal links, avoiding existing links and self-links.
         Improved: Prevent overlapping/nested links by selecting non-overlapping matches.
+        
+        The document is parsed once; new anchors are inserted into that tree directly.
+        With whole_document=True all text nodes are scanned in a single matcher pass;
+        otherwise each text node is matched separately.
+        
+        With streaming=True the article is read and rewritten in chunks without
+        building a tree (see link_html_stream), so memory use does not grow with
+        the article size. Existing links are counted in a first pass over the file.
+        
+        Returns:
+            LinkingResult with the linked HTML and the existing, added and total link counts
         """
+        if streaming:
+            return self._create_html_links_streaming(article_file, output_file, max_links)
+        
         try:
             with open(article_file, 'r', encoding='utf-8') as f:
                 content = f.read()
         except FileNotFoundError:
             logger.error(f"Article file {article_file} not found")
-            return ""
+            return LinkingResult(html="", existing_links=0, new_links_added=0)
+
+        result = self.link_html(content, max_links=max_links, whole_document=whole_document)
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(result.html)
+        return result
+
+    def find_link_edits(self, content: str, max_links: int = 12, current_url: str = None) -> LinkingResult:
+        """
+        Find where links should be inserted into article content without rewriting it.
+        
+        Args:
+            content: Article text or HTML, optionally starting with a {current_url = "..."} line
+            max_links: Maximum number of links the document may contain
+            current_url: URL of the article itself, excluded from linking; read from the
+                {current_url = "..."} line when not given
+            
+        Returns:
+            LinkingResult with html=None, the link counts and the edits, whose offsets
+            refer to content as given (including any {current_url = "..."} line)
+        """
+        if current_url:
+            current_url = current_url.rstrip('/')
+        else:
+            current_url = self._extract_current_url(content)
+        
+        html_content = self._strip_current_url_directive(content)
+        edits, existing_links = self._compute_link_edits(html_content, max_links, current_url)
+        skipped = len(content) - len(html_content)
+        if skipped:
+            edits = [LinkEdit(edit.offset + skipped, edit.length, edit.href, edit.term) for edit in edits]
+        return LinkingResult(html=None, existing_links=existing_links, new_links_added=len(edits), edits=edits)
+
+    def _compute_link_edits(self, html_content: str, max_links: int,
+                            current_url: Optional[str]) -> Tuple[List[LinkEdit], int]:
+        """
+        Compute the links to insert into HTML with the streaming tokenizer.
+        
+        Returns:
+            Tuple of (edits sorted by offset, number of existing links)
+        """
+        existing_links = count_links([html_content])
+        if max_links - existing_links <= 0:
+            logger.info("No new links will be added - article already has maximum links")
+            return [], existing_links
+        rewriter = StreamingLinkRewriter(self, None, max_links=max_links, current_url=current_url,
+                                         existing_links=existing_links)
+        rewriter.feed(html_content)
+        rewriter.close()
+        return rewriter.edits, existing_links
+
+    def _start_rewriter(self, head: str, write: Callable[[str], object], max_links: int, current_url: Optional[str],
+                        existing_links: Optional[int],
+                        on_block: Optional[Callable[[], object]] = None) -> Tuple[StreamingLinkRewriter, str]:
+        """
+        Create the streaming rewriter for an article and strip its directive line.
+        
+        Returns:
+            Tuple of (rewriter, start of the article to feed it)
+        """
+        if current_url:
+            current_url = current_url.rstrip('/')
+        else:
+            current_url = self._extract_current_url(head)
+        rewriter = StreamingLinkRewriter(self, write, max_links=max_links, current_url=current_url,
+                                         existing_links=existing_links, on_block=on_block)
+        return rewriter, self._strip_current_url_directive(head)
+
+    def _create_html_links_streaming(self, article_file: str, output_file: str = None,
+                                     max_links: int = 12) -> LinkingResult:
+        """
+        Stream an article file through the rewriter into output_file, or into memory if not given.
+        """
+        try:
+            with open(article_file, 'rb') as f:
+                if output_file:
+                    with open(output_file, 'w', encoding='utf-8') as out:
+                        return self.link_file(f, max_links=max_links, write=out.write)
+                return self.link_file(f, max_links=max_links)
+        except FileNotFoundError:
+            logger.error(f"Article file {article_file} not found")
+            return LinkingResult(html="", existing_links=0, new_links_added=0)
+
+    def link_file(self, file: BinaryIO, max_links: int = 12, current_url: str = None, encoding: str = 'utf-8',
+                  write: Callable[[str], object] = None) -> LinkingResult:
+        """
+        Insert internal links into an article read from a binary file object in chunks.
+        
+        The file is read twice: once to count its existing links and once to rewrite
+        it, so it must be seekable. Neither pass holds the whole article in memory.
+        
+        Args:
+            file: Seekable binary file positioned at the start of the article
+            max_links: Maximum number of links the document may contain
+            current_url: URL of the article itself, excluded from linking; read from the
+                {current_url = "..."} line when not given
+            encoding: Text encoding of the file
+            write: Called with each piece of the linked output; the output is collected
+                into the result's html when not given
+            
+        Returns:
+            LinkingResult with the linked HTML (None if write was given) and the link counts
+        
+        Raises:
+            UnicodeDecodeError: If the file is not valid in the given encoding
+        """
+        start = file.tell()
+        existing_links = count_links(self._iter_text_chunks(file, encoding))
+        file.seek(start)
+        if write is not None:
+            return self.link_html_stream(self._iter_text_chunks(file, encoding), write, max_links=max_links,
+                                         current_url=current_url, existing_links=existing_links)
+        pieces = []
+        result = self.link_html_stream(self._iter_text_chunks(file, encoding), pieces.append, max_links=max_links,
+                                       current_url=current_url, existing_links=existing_links)
+        result.html = ''.join(pieces)
+        return result
+
+    def _iter_text_chunks(self, file: BinaryIO, encoding: str) -> Iterator[str]:
+        """
+        Read and decode a binary file in STREAM_CHUNK_SIZE blocks.
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        for block in iter(lambda: file.read(self.STREAM_CHUNK_SIZE), b''):
+            text = decoder.decode(block)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def link_html_stream(self, chunks: Iterable[str], write: Callable[[str], object], max_links: int = 12,
+                         current_url: str = None, existing_links: int = None,
+                         on_block: Callable[[], object] = None) -> LinkingResult:
+        """
+        Insert internal links into an article read in chunks, writing the output as it goes.
+        
+        No document tree is built: the HTML is tokenized incrementally and copied to
+        write unchanged apart from the inserted anchors. Text inside <a>, <script>,
+        <style>, <textarea> and <title> is not linked.
+        
+        Args:
+            chunks: Article text in consecutive chunks, optionally starting with a
+                {current_url = "..."} line
+            write: Called with each piece of the linked output
+            max_links: Maximum number of links the document may contain
+            current_url: URL of the article itself, excluded from linking; read from the
+                {current_url = "..."} line when not given
+            existing_links: Number of links already in the article. When not given they
+                are counted as they are read, so links later in the article do not
+                limit the links added before them
+            on_block: Called before each block-level start tag, once all output before
+                it has been written
+            
+        Returns:
+            LinkingResult with html=None and the existing, added and total link counts
+        """
+        rewriter = None
+        head = ''
+        for chunk in chunks:
+            if rewriter is None:
+                # Hold back the start of the article until a directive line is complete
+                head += chunk
+                start = head.lstrip()
+                if not start or (start.startswith('{') and '}' not in start and len(head) < self.STREAM_CHUNK_SIZE):
+                    continue
+                rewriter, chunk = self._start_rewriter(head, write, max_links, current_url, existing_links, on_block)
+            rewriter.feed(chunk)
+        if rewriter is None:
+            rewriter, chunk = self._start_rewriter(head, write, max_links, current_url, existing_links, on_block)
+            rewriter.feed(chunk)
+        rewriter.close()
+        
+        result = LinkingResult(html=None, existing_links=rewriter.existing_links, new_links_added=rewriter.new_links_added)
+        logger.info(f"Added {result.new_links_added} new links. Total links: {result.total_links}")
+        return result
+
+    def link_html_blocks(self, content: str, emit: Callable[[str], object], max_links: int = 12,
+                         current_url: str = None) -> LinkingResult:
+        """
+        Insert internal links into an article, emitting the linked HTML block by block.
+        
+        The output is cut before every block-level start tag (paragraphs, headings,
+        list items and the like), so each emitted piece is final as soon as the
+        rewriter has linked it. Joined together the pieces are the same HTML as
+        link_html(content, output='patch') returns.
+        
+        Args:
+            content: Article text or HTML, optionally starting with a {current_url = "..."} line
+            emit: Called with each non-empty block of linked HTML, in order
+            max_links: Maximum number of links the document may contain
+            current_url: URL of the article itself, excluded from linking
+            
+        Returns:
+            LinkingResult with html=None and the existing, added and total link counts
+        """
+        pieces = []
+        
+        def flush():
+            if pieces:
+                emit(''.join(pieces))
+                pieces.clear()
+        
+        result = self.link_html_stream([content], pieces.append, max_links=max_links, current_url=current_url,
+                                       existing_links=count_links([content]), on_block=flush)
+        flush()
+        return result
 
+    def link_html(self, content: str, max_links: int = 12, current_url: str = None,
+                  whole_document: bool = True, output: str = 'tree') -> LinkingResult:
+        """
+        Insert internal links into article content held in memory.
+        
+        Args:
+            content: Article text or HTML, optionally starting with a {current_url = "..."} line
+            max_links: Maximum number of links the document may contain
+            current_url: URL of the article itself, excluded from linking; read from the
+                {current_url = "..."} line when not given
+            whole_document: Scan all text nodes in a single matcher pass
+            output: 'tree' to serialise the parsed document, or 'patch' to insert the
+                links into the source text, leaving everything else byte-for-byte unchanged
+            
+        Returns:
+            LinkingResult with the linked HTML and the existing, added and total link counts
+        """
+        if output not in self.OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode {output!r}, expected one of {self.OUTPUT_MODES}")
+        
         # Extract current_url if present
-        current_url = self._extract_current_url(content)
+        if current_url:
+            current_url = current_url.rstrip('/')
+        else:
+            current_url = self._extract_current_url(content)
         if current_url:
             logger.info(f"Detected current_url for self-link exclusion: {current_url}")
 
         # Parse the HTML (skip the current_url line if present)
-        html_start = content.find('<')
-        html_content = content[html_start:] if html_start != -1 else content
-        soup = BeautifulSoup(html_content, 'html.parser')
+        html_content = self._strip_current_url_directive(content)
+        if output == 'patch':
+            edits, existing_links = self._compute_link_edits(html_content, max_links, current_url)
+            result = LinkingResult(html=apply_link_edits(html_content, edits), existing_links=existing_links,
+                                   new_links_added=len(edits))
+            logger.info(f"Added {result.new_links_added} new links. Total links: {result.total_links}")
+            return result
+        soup = parse_html(html_content, self.parser)
 
-        # Count existing links
-        existing_links = len(soup.find_all('a'))
+        # Collect existing links and the text nodes outside them in one pass
+        anchors, text_nodes = self._collect_nodes(soup)
+        existing_links = len(anchors)
         logger.info(f"Found {existing_links} existing links in the article")
 
         # Calculate how many new links we can add
@@ -425,77 +917,80 @@ class EnhancedInternalLinker:
 
         if available_slots <= 0:
             logger.info("No new links will be added - article already has maximum links")
-            return content
+            return LinkingResult(html=html_content, existing_links=existing_links, new_links_added=0)
 
         used_urls = set()
         links_added = 0
 
-        # Find all text nodes that are not inside anchor tags
-        text_nodes = []
-        for element in soup.find_all(string=True):
-            if element.parent.name != 'a':
-                text_nodes.append(element)
+        texts = [str(text_node) for text_node in text_nodes]
+        if whole_document:
+            node_occurrences = self._find_document_occurrences(texts)
 
-        for text_node in text_nodes:
+        for node_index, text_node in enumerate(text_nodes):
             if text_node.strip() and links_added < available_slots:
-                matches = self._find_matches_with_tracking(str(text_node), used_urls, available_slots - links_added, current_url)
+                if whole_document:
+                    # Text nodes outside anchors contain no existing links
+                    matches = self._select_term_matches(texts[node_index], used_urls, SpanIndex(), available_slots - links_added,
+                                                        current_url, node_occurrences[node_index])
+                else:
+                    matches = self._find_matches_with_tracking(texts[node_index], used_urls, available_slots - links_added, current_url)
                 # Build match dicts for overlap selection
                 match_objs = [
                     {'start': start, 'end': end, 'term': term, 'url': url, 'length': end - start}
                     for term, url, start, end in matches
                 ]
                 # Select maximal set of non-overlapping matches (prefer longer, then earlier)
-                match_objs.sort(key=lambda m: (-m['length'], m['start']))
-                selected = []
-                occupied = set()
-                for m in match_objs:
-                    rng = set(range(m['start'], m['end']))
-                    if occupied & rng:
-                        continue
-                    selected.append(m)
-                    occupied.update(rng)
-                # Sort by start for left-to-right replacement
-                selected.sort(key=lambda m: m['start'])
-                # Replace from end to start to avoid index shifting
-                text_content = str(text_node)
-                for m in reversed(selected):
-                    if links_added >= available_slots:
-                        break
-                    original_text = text_content[m['start']:m['end']]
-                    html_link = f'<a href="{m["url"]}">{original_text}</a>'
-                    text_content = text_content[:m['start']] + html_link + text_content[m['end']:]
-                    links_added += 1
-                new_soup = BeautifulSoup(text_content, 'html.parser')
-                text_node.replace_with(new_soup)
+                selected = select_non_overlapping(match_objs, limit=available_slots - links_added)
+                if not selected:
+                    continue
+                # Split the text node around the matches and insert anchor tags in place
+                text_content = texts[node_index]
+                new_nodes = []
+                last_end = 0
+                for m in selected:
+                    if m['start'] > last_end:
+                        new_nodes.append(NavigableString(text_content[last_end:m['start']]))
+                    anchor_tag = soup.new_tag('a', href=m['url'])
+                    anchor_tag.string = text_content[m['start']:m['end']]
+                    new_nodes.append(anchor_tag)
+                    last_end = m['end']
+                if last_end < len(text_content):
+                    new_nodes.append(NavigableString(text_content[last_end:]))
+                text_node.replace_with(*new_nodes)
+                links_added += len(selected)
 
-        result = str(soup)
-        if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(result)
-        logger.info(f"Added {links_added} new links. Total links: {existing_links + links_added}")
+        result = LinkingResult(html=str(soup), existing_links=existing_links, new_links_added=links_added)
+        logger.info(f"Added {links_added} new links. Total links: {result.total_links}")
         return result
     
     def get_statistics(self) -> Dict:
         """
         Get statistics about the glossary.
         
+        Computed once per glossary load, since entries of a mapped index are
+        decoded on every access.
+        
         Returns:
             Dictionary with statistics
         """
-        categories = {}
-        total_aliases = 0
-        
-        for term_obj in self.glossary_terms:
-            category = term_obj.get('category', 'unknown')
-            categories[category] = categories.get(category, 0) + 1
-            total_aliases += len(term_obj.get('aliases', []))
-        
-        return {
-            'total_terms': len(self.glossary_terms),
-            'total_aliases': total_aliases,
-            'categories': categories,
-            'unique_urls': len(set(term_obj.get('url', '') for term_obj in self.glossary_terms))
-        }
+        if self._statistics is None:
+            categories = {}
+            total_aliases = 0
+            urls = set()
+            
+            for term_obj in self.glossary_terms:
+                category = term_obj.get('category', 'unknown')
+                categories[category] = categories.get(category, 0) + 1
+                total_aliases += len(term_obj.get('aliases', []))
+                urls.add(term_obj.get('url', ''))
+            
+            self._statistics = {
+                'total_terms': len(self.glossary_terms),
+                'total_aliases': total_aliases,
+                'categories': categories,
+                'unique_urls': len(urls)
+            }
+        return {**self._statistics, 'categories': dict(self._statistics['categories'])}
 
 def main():
     """Main function to demonstrate usage."""
@@ -533,7 +1028,8 @@ def main():
     # Demonstrate link limiting
     print("\n=== LINK LIMITING DEMO ===")
     print("Creating HTML with 12-link limit...")
-    html = linker.create_html_links('Articles/policy-mix', 'demo-12-links.html', max_links=12)
+    result = linker.create_html_links('Articles/policy-mix', 'demo-12-links.html', max_links=12)
+    print(f"Added {result.new_links_added} links ({result.total_links} total)")
     print("✅ Demo completed! Check demo-12-links.html")
 
 if __name__ == "__main__":
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Compiled glossary index: a versioned, checksummed binary file holding the glossary
+entries, lookup tables and the prebuilt term matcher, so the linker can start
+without parsing the JSON glossary or building the automaton.
+
+The file is flat and read-only: every string lives in one UTF-8 heap, and all
+tables are arrays of string ids, entry ids or automaton states. It is used in
+place through mmap, so all processes on a host that load the same index share
+its pages instead of each building their own dicts.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import accumulate, chain
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from term_matcher import DenseAhoCorasickMatcher, TermTable
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'GLOSSIDX'
+
+# Bumped whenever the layout of the file changes
+INDEX_FORMAT_VERSION = 2
+
+INDEX_SUFFIX = '.idx'
+
+# Magic, format version and header length
+_PREAMBLE = struct.Struct(f'<{len(INDEX_MAGIC)}sII')
+
+# Sections start at multiples of this many bytes
+_ALIGNMENT = 8
+
+
+def glossary_index_path(glossary_file: str) -> str:
+    """
+    Get the default index path of a glossary: the glossary path with an .idx suffix.
+    """
+    return os.path.splitext(glossary_file)[0] + INDEX_SUFFIX
+
+
+def file_sha256(path: str) -> str:
+    """
+    Compute the sha256 hex digest of a file's bytes.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_glossary_index(index_file: str, linker, source_sha256: str):
+    """
+    Write the compiled index of a linker's glossary, replacing any existing file atomically.
+
+    Args:
+        index_file: Path of the index to write
+        linker: EnhancedInternalLinker built from the JSON glossary
+        source_sha256: sha256 of the glossary file the linker was built from
+    """
+    string_ids: Dict[str, int] = {}
+    heap = bytearray()
+    string_offsets = array('I', [0])
+
+    def strings(texts) -> array:
+        ids = array('I')
+        for text in texts:
+            string_id = string_ids.get(text)
+            if string_id is None:
+                string_id = string_ids[text] = len(string_offsets) - 1
+                heap.extend(text.encode('utf-8'))
+                string_offsets.append(len(heap))
+            ids.append(string_id)
+        return ids
+
+    def sorted_order(keys: List[str]) -> array:
+        return array('I', sorted(range(len(keys)), key=keys.__getitem__))
+
+    entries = linker.glossary_terms
+    entry_ids = {id(entry): index for index, entry in enumerate(entries)}
+    table = linker.term_table
+    matcher = linker.term_matcher.to_dense()
+    url_keys = list(linker.term_to_url_map)
+    entry_keys = list(linker.term_entries)
+    categories = list(linker.terms_by_category)
+    members = [[entry_ids[id(entry)] for entry in linker.terms_by_category[category]] for category in categories]
+
+    sections = {
+        'entries': strings(json.dumps(entry, ensure_ascii=False) for entry in entries),
+        'term_strings': strings(table.terms),
+        'term_urls': strings(table.urls),
+        'term_order': sorted_order(list(table.terms)),
+        'url_keys': strings(url_keys),
+        'url_values': strings(linker.term_to_url_map.values()),
+        'url_order': sorted_order(url_keys),
+        'entry_keys': strings(entry_keys),
+        'entry_values': array('I', [entry_ids[id(entry)] for entry in linker.term_entries.values()]),
+        'entry_order': sorted_order(entry_keys),
+        'category_keys': strings(categories),
+        'category_order': sorted_order(categories),
+        'category_starts': array('I', accumulate(chain([0], map(len, members)))),
+        'category_members': array('I', chain.from_iterable(members)),
+        'term_lengths': matcher.term_lengths,
+        'alphabet': matcher.alphabet,
+        'transitions': matcher.transitions,
+        'term_at': matcher.term_at,
+        'output_link': matcher.output_link,
+    }
+    sections['string_offsets'] = string_offsets
+    sections['heap'] = array('B', heap)
+
+    payload = bytearray()
+    layout = {}
+    for name, values in sections.items():
+        payload.extend(bytes(_aligned(len(payload)) - len(payload)))
+        layout[name] = [len(payload), values.typecode, len(values)]
+        payload.extend(values.tobytes())
+
+    header = json.dumps({
+        'source_sha256': source_sha256,
+        'glossary_version': linker.glossary_version,
+        'payload_sha256': hashlib.sha256(payload).hexdigest(),
+        'byteorder': sys.byteorder,
+        'terms': len(table),
+        'states': matcher.state_count,
+        'sections': layout,
+    }, sort_keys=True).encode('utf-8')
+    padding = bytes(_aligned(_PREAMBLE.size + len(header)) - _PREAMBLE.size - len(header))
+
+    directory = os.path.dirname(os.path.abspath(index_file))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.glossary-', suffix=INDEX_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREAMBLE.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(padding)
+            f.write(payload)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, index_file)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_index_header(data) -> Tuple[Dict, int]:
+    """
+    Parse the preamble and header of a compiled glossary index.
+
+    Args:
+        data: Contents of the index file (bytes or mmap)
+
+    Returns:
+        Tuple of (header dictionary, offset of the payload)
+
+    Raises:
+        ValueError: If the file is not an index in the current format
+    """
+    if len(data) < _PREAMBLE.size:
+        raise ValueError("file is truncated")
+    magic, format_version, header_length = _PREAMBLE.unpack_from(data)
+    if magic != INDEX_MAGIC:
+        raise ValueError("not a glossary index")
+    if format_version != INDEX_FORMAT_VERSION:
+        raise ValueError(f"format version {format_version}, expected {INDEX_FORMAT_VERSION}")
+    header_end = _PREAMBLE.size + header_length
+    header = json.loads(data[_PREAMBLE.size:header_end].decode('utf-8'))
+    return header, _aligned(header_end)
+
+
+class StringArray(Sequence):
+    """
+    Strings of the index, given by their ids into the string heap.
+    """
+
+    __slots__ = ('_heap', '_offsets', '_ids')
+
+    def __init__(self, heap: memoryview, offsets: memoryview, ids: memoryview):
+        self._heap = heap
+        self._offsets = offsets
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        string_id = self._ids[index]
+        return str(self._heap[self._offsets[string_id]:self._offsets[string_id + 1]], 'utf-8')
+
+
+class EntryArray(Sequence):
+    """
+    Glossary entries of the index, decoded from their JSON text when accessed.
+    """
+
+    __slots__ = ('_texts',)
+
+    def __init__(self, texts: StringArray):
+        self._texts = texts
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return json.loads(self._texts[index])
+
+
+class FlatMapping(Mapping):
+    """
+    Read-only string-keyed mapping of the index.
+
+    Keys iterate in their original (glossary) order; lookups binary search a
+    permutation of the keys sorted by code point.
+    """
+
+    __slots__ = ('_keys', '_order', '_value')
+
+    def __init__(self, keys: Sequence[str], order: memoryview, value: Callable[[int], object]):
+        """
+        Args:
+            keys: Keys in original order
+            order: Positions of the keys, sorted by key
+            value: Returns the value for the key at a position
+        """
+        self._keys = keys
+        self._order = order
+        self._value = value
+
+    def _position(self, key) -> int:
+        keys = self._keys
+        order = self._order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if keys[order[middle]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and keys[order[low]] == key:
+            return order[low]
+        return -1
+
+    def __getitem__(self, key):
+        position = self._position(key) if isinstance(key, str) else -1
+        if position < 0:
+            raise KeyError(key)
+        return self._value(position)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._position(key) >= 0
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class GlossaryIndex:
+    """
+    Compiled glossary index mapped into memory, exposing the same structures the
+    linker builds from JSON.
+
+    Nothing is copied out of the file up front: strings and entries are decoded
+    when looked up, and the matcher scans straight from the mapped tables.
+    """
+
+    def __init__(self, buffer: memoryview, header: Dict, is_current: bool = True):
+        """
+        Args:
+            buffer: Payload of the index file
+            header: Parsed index header
+            is_current: Whether the index was compiled from the current glossary file
+        """
+        self.glossary_version: str = header['glossary_version']
+        self.source_sha256: str = header['source_sha256']
+        self.is_current = is_current
+        tables = {}
+        for name, (offset, typecode, count) in header['sections'].items():
+            itemsize = array(typecode).itemsize
+            tables[name] = buffer[offset:offset + count * itemsize].cast(typecode)
+
+        heap, offsets = tables['heap'], tables['string_offsets']
+
+        def strings(name: str) -> StringArray:
+            return StringArray(heap, offsets, tables[name])
+
+        entries = EntryArray(strings('entries'))
+        terms = strings('term_strings')
+        urls = strings('term_urls')
+        url_values = strings('url_values')
+        entry_values = tables['entry_values']
+        starts, members = tables['category_starts'], tables['category_members']
+
+        self.glossary_terms: Sequence[Dict] = entries
+        self.term_to_url_map: Mapping[str, str] = FlatMapping(strings('url_keys'), tables['url_order'],
+                                                              url_values.__getitem__)
+        self.term_entries: Mapping[str, Dict] = FlatMapping(strings('entry_keys'), tables['entry_order'],
+                                                            lambda position: entries[entry_values[position]])
+        self.terms_by_category: Mapping[str, List[Dict]] = FlatMapping(
+            strings('category_keys'), tables['category_order'],
+            lambda position: [entries[member] for member in members[starts[position]:starts[position + 1]]]
+        )
+        self.term_table = TermTable.from_columns(terms, urls, FlatMapping(terms, tables['term_order'], int))
+        self.term_matcher = DenseAhoCorasickMatcher(terms, tables['term_lengths'], tables['alphabet'],
+                                                    tables['transitions'], tables['term_at'], tables['output_link'])
+
+
+def load_glossary_index(index_file: str, glossary_file: str, allow_stale: bool = False) -> Optional[GlossaryIndex]:
+    """
+    Map a compiled glossary index if it is valid and up to date.
+
+    The index is only used if it is in the current format and byte order and its
+    checksum matches, and, unless allow_stale is set, if it was compiled from the
+    current contents of glossary_file.
+
+    Args:
+        index_file: Path of the compiled index
+        glossary_file: Path of the JSON glossary the index must have been compiled from
+        allow_stale: Also return an index compiled from an earlier version of the
+            glossary, with is_current False, to use as a base for the changes since
+
+    Returns:
+        The mapped index, or None if the glossary should be loaded from JSON
+    """
+    try:
+        with open(index_file, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning(f"Ignoring glossary index {index_file}: {e}")
+        return None
+
+    try:
+        header, payload_offset = read_index_header(mapped)
+        try:
+            source_sha256 = file_sha256(glossary_file)
+        except FileNotFoundError:
+            source_sha256 = None
+        is_current = header['source_sha256'] == source_sha256
+        if not is_current and not allow_stale:
+            logger.warning(f"Glossary index {index_file} is stale, loading {glossary_file} instead")
+            return None
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"written on a {header['byteorder']}-endian host")
+        payload = memoryview(mapped)[payload_offset:]
+        if hashlib.sha256(payload).hexdigest() != header['payload_sha256']:
+            raise ValueError("checksum mismatch")
+        index = GlossaryIndex(payload, header, is_current)
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring glossary index {index_file}: {e}")
+        return None
+
+    logger.info(f"Mapped glossary index {index_file} ({header['terms']} terms, {header['states']} states)")
+    return index
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Hot reloading of the glossary behind a running API.
+"""
+
+import asyncio
+import json
+import os
+import signal
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+import logging
+
+from compile_glossary import compile_glossary
+from enhanced_internal_linking import EnhancedInternalLinker
+from glossary_store import read_glossary, write_glossary
+from linking_executor import LinkingExecutor
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+
+# Terms a glossary may gain or lose on top of its compiled index before the index is recompiled
+MAX_INDEX_DELTA = 256
+
+
+class GlossaryReloadError(Exception):
+    """Raised when the glossary file cannot be read; the current glossary stays in use."""
+
+
+def _read_glossary(glossary_file: str) -> List[Dict]:
+    try:
+        return read_glossary(glossary_file)
+    except FileNotFoundError as e:
+        raise GlossaryReloadError(f"Glossary file not found: {e.filename}")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise GlossaryReloadError(f"Glossary is not valid JSON: {e}")
+
+
+def build_linker(glossary_file: str, nlp_model: str, parser: str, max_index_delta: int = MAX_INDEX_DELTA,
+                 terms: Optional[List[Dict]] = None) -> EnhancedInternalLinker:
+    """
+    Build a linker for the glossary as it is now on disk.
+
+    The glossary is read once, by this function, which also checks that it is
+    valid; a caller that has just written it passes its entries as terms instead.
+
+    A glossary that changed since its index was compiled is matched with the
+    index plus a small automaton for the changed terms, so a change costs time in
+    proportion to its size. Once max_index_delta terms have changed, or if there
+    is no usable index, the index is recompiled first, and the new linker (and any
+    worker processes) map it instead of parsing the JSON. If the index cannot be
+    written the linker is used as it is.
+
+    Raises:
+        GlossaryReloadError: If the glossary is missing or is not valid JSON
+    """
+    if terms is None:
+        terms = _read_glossary(glossary_file)
+    linker = EnhancedInternalLinker(glossary_file, nlp_model=nlp_model, parser=parser, glossary_terms=terms)
+    if linker.index_delta is not None and linker.index_delta < max_index_delta:
+        return linker
+    try:
+        compile_glossary(glossary_file, linker.index_file)
+    except OSError as e:
+        logger.warning(f"Could not write glossary index {linker.index_file}: {e}")
+        return linker
+    logger.info(f"Compiled glossary index {linker.index_file}")
+    return EnhancedInternalLinker(glossary_file, nlp_model=nlp_model, parser=parser)
+
+
+class GlossaryReloader:
+    """
+    Holds the linker snapshot serving requests and swaps in a new one when the glossary changes.
+
+    A snapshot is a LinkingExecutor together with its linker. Requests take the
+    current snapshot once, with `async with reloader.snapshot() as executor`, and
+    use it throughout, so a reload never changes the glossary under a running
+    request. A reload builds the new linker in the background, loads it into the
+    worker processes the snapshots share (if any), swaps it in with a single
+    assignment, and shuts the old snapshot down once the last request holding it
+    has finished.
+
+    Reloads are triggered by reload(), by SIGHUP (install_signal_handler) or by
+    polling the glossary file's modification time (start_polling). edit_glossary
+    changes the glossary file and reloads it in one step. A result cache given to
+    the reloader is switched to each new glossary version as it is swapped in.
+    """
+
+    def __init__(self, executor: LinkingExecutor, poll_interval: float = 0,
+                 max_index_delta: int = MAX_INDEX_DELTA, result_cache: Optional[ResultCache] = None):
+        """
+        Initialize the reloader.
+
+        Args:
+            executor: Executor of the initial linker
+            poll_interval: Seconds between checks of the glossary file (0 disables polling)
+            max_index_delta: Changed terms after which a reload recompiles the glossary index
+            result_cache: Cache of results for the served glossary version, if any
+        """
+        self._current = executor
+        self.result_cache = result_cache
+        if result_cache is not None:
+            result_cache.set_glossary_version(executor.linker.glossary_version)
+        self.poll_interval = poll_interval
+        self.max_index_delta = max_index_delta
+        self.reloads = 0
+        self._lock = asyncio.Lock()
+        self._file_state = self._stat()
+        self._poller: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def current(self) -> LinkingExecutor:
+        """
+        Executor of the snapshot new requests get.
+        """
+        return self._current
+
+    @property
+    def linker(self) -> EnhancedInternalLinker:
+        """
+        Linker of the current snapshot.
+        """
+        return self._current.linker
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[LinkingExecutor]:
+        """
+        Use the current snapshot for the duration of a request.
+        """
+        executor = self._current
+        executor.acquire()
+        try:
+            yield executor
+        finally:
+            executor.release()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.linker.glossary_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    async def reload(self, force: bool = False) -> Dict:
+        """
+        Rebuild the linker from the glossary file and swap it in.
+
+        Args:
+            force: Swap in a new snapshot even if the glossary version is unchanged
+
+        Returns:
+            Dictionary with 'reloaded', 'glossary_version', 'previous_version' and
+            'index_delta' (terms changed since the glossary index was compiled)
+
+        Raises:
+            GlossaryReloadError: If the glossary cannot be loaded
+        """
+        async with self._lock:
+            return await self._reload(force)
+
+    async def _reload(self, force: bool, terms: Optional[List[Dict]] = None) -> Dict:
+        old = self._current
+        self._file_state = self._stat()
+        linker = await asyncio.to_thread(build_linker, old.linker.glossary_file, old.linker.nlp_model,
+                                         old.linker.parser, self.max_index_delta, terms)
+        previous_version = old.linker.glossary_version
+        result = {'glossary_version': linker.glossary_version, 'previous_version': previous_version,
+                  'index_delta': linker.index_delta}
+        if linker.glossary_version == previous_version and not force:
+            logger.info(f"Glossary version {previous_version} is unchanged, keeping the current snapshot")
+            return {'reloaded': False, **result}
+
+        executor = await asyncio.to_thread(old.with_linker, linker)
+        await executor.warm_up()
+        self._current = executor
+        if self.result_cache is not None:
+            self.result_cache.set_glossary_version(linker.glossary_version)
+        old.retire()
+        self.reloads += 1
+        logger.info(f"Reloaded glossary: version {previous_version} -> {linker.glossary_version}")
+        return {'reloaded': True, **result}
+
+    async def edit_glossary(self, edit: Callable[[List[Dict]], Any]) -> Tuple[Any, Dict]:
+        """
+        Change the glossary file and swap in a linker for the result.
+
+        The edit is applied to the entries as they are on disk, which are then
+        written back atomically and reloaded from the edited entries, without
+        reading the file again. Edits and reloads run one at a time.
+
+        Args:
+            edit: Called with the list of glossary entries to change it in place;
+                if it raises, the file is left unchanged and the exception propagates
+
+        Returns:
+            Tuple of (the edit's return value, result of the reload as from reload())
+
+        Raises:
+            GlossaryReloadError: If the glossary cannot be read
+        """
+        async with self._lock:
+            glossary_file = self.linker.glossary_file
+            terms = await asyncio.to_thread(_read_glossary, glossary_file)
+            outcome = edit(terms)
+            await asyncio.to_thread(write_glossary, glossary_file, terms)
+            return outcome, await self._reload(False, terms)
+
+    async def _reload_in_background(self, reason: str):
+        logger.info(f"Reloading glossary ({reason})")
+        try:
+            await self.reload()
+        except GlossaryReloadError as e:
+            logger.error(f"Glossary reload failed, keeping version {self.linker.glossary_version}: {e}")
+        except Exception:
+            logger.exception("Glossary reload failed")
+
+    def _on_sighup(self):
+        task = asyncio.ensure_future(self._reload_in_background('SIGHUP'))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def install_signal_handler(self):
+        """
+        Reload the glossary on SIGHUP. Does nothing where signal handlers are unavailable.
+        """
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self._on_sighup)
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            logger.info("SIGHUP glossary reloads are not available on this platform")
+
+    def start_polling(self):
+        """
+        Check the glossary file every poll_interval seconds and reload it when it changes.
+        """
+        if self.poll_interval > 0 and self._poller is None:
+            self._poller = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self._stat() != self._file_state:
+                await self._reload_in_background('glossary file changed')
+
+    async def stop(self):
+        """
+        Stop polling and shut down the current snapshot.
+        """
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        try:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        except (AttributeError, NotImplementedError, RuntimeError, ValueError):
+            pass
+        self._current.shutdown()
+
+    def get_statistics(self) -> Dict:
+        """
+        Get the version and reload count of the served glossary.
+        """
+        return {
+            'glossary_version': self.linker.glossary_version,
+            'reloads': self.reloads,
+            'poll_interval': self.poll_interval
+        }
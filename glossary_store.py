@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Edits to the JSON glossary file: adding, updating and removing single entries and aliases.
+
+Entries are identified by their URL, the glossary page they link to; when
+several entries share a URL, an edit applies to all of them. Every edit
+rewrites the file atomically, so the linker, the index compiler and other
+processes never read a partly written glossary.
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, List
+
+
+class GlossaryEntryNotFoundError(Exception):
+    """Raised when an edit refers to an entry or alias that is not in the glossary."""
+
+
+def read_glossary(glossary_file: str) -> List[Dict]:
+    """
+    Read the glossary entries from a JSON file.
+
+    Raises:
+        FileNotFoundError: If the glossary does not exist
+        json.JSONDecodeError: If the glossary is not valid JSON
+    """
+    with open(glossary_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_glossary(glossary_file: str, terms: List[Dict]):
+    """
+    Write the glossary entries, replacing the file atomically.
+
+    The file keeps the format written by process_glossary_urls.py, so edits show
+    up as small diffs.
+
+    Args:
+        glossary_file: Path of the JSON glossary
+        terms: Glossary entries, in glossary order
+    """
+    directory = os.path.dirname(os.path.abspath(glossary_file))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.glossary-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(terms, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, glossary_file)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def find_entries(terms: List[Dict], url: str) -> List[int]:
+    """
+    Find the positions of the entries for a glossary page.
+
+    A glossary can hold several entries for the same page (generated in separate
+    runs, with different spellings and aliases); edits apply to all of them.
+
+    Args:
+        terms: Glossary entries
+        url: URL of the entries
+
+    Returns:
+        Indexes of the entries in terms, in glossary order (empty if there are none)
+    """
+    return [position for position, term_obj in enumerate(terms) if term_obj.get('url') == url]
+
+
+def _require_entries(terms: List[Dict], url: str) -> List[int]:
+    positions = find_entries(terms, url)
+    if not positions:
+        raise GlossaryEntryNotFoundError(f"No glossary entry for {url}")
+    return positions
+
+
+def put_entry(terms: List[Dict], entry: Dict) -> bool:
+    """
+    Add an entry, or replace the entries with the same URL.
+
+    The entry takes the place of the first entry for its URL, and any other
+    entries for that URL are removed.
+
+    Args:
+        terms: Glossary entries (updated in place)
+        entry: Entry with 'term', 'url', 'aliases' and 'category'
+
+    Returns:
+        True if the entry was added, False if existing ones were replaced
+
+    Raises:
+        ValueError: If the entry has no term or URL
+    """
+    if not entry.get('term', '').strip() or not entry.get('url', '').strip():
+        raise ValueError("A glossary entry needs a term and a URL")
+    positions = find_entries(terms, entry['url'])
+    if not positions:
+        terms.append(entry)
+        return True
+    for position in reversed(positions[1:]):
+        del terms[position]
+    terms[positions[0]] = entry
+    return False
+
+
+def remove_entry(terms: List[Dict], url: str) -> List[Dict]:
+    """
+    Remove every entry for a glossary page.
+
+    Returns:
+        The removed entries, in glossary order
+
+    Raises:
+        GlossaryEntryNotFoundError: If there is no entry for url
+    """
+    positions = _require_entries(terms, url)
+    removed = [terms[position] for position in positions]
+    for position in reversed(positions):
+        del terms[position]
+    return removed
+
+
+def add_alias(terms: List[Dict], url: str, alias: str) -> List[Dict]:
+    """
+    Add an alias for a glossary page, unless one of its entries already has it
+    (compared case-insensitively). The alias is added to the first entry.
+
+    Returns:
+        The entries for url
+
+    Raises:
+        ValueError: If the alias is empty
+        GlossaryEntryNotFoundError: If there is no entry for url
+    """
+    if not alias.strip():
+        raise ValueError("An alias cannot be empty")
+    entries = [terms[position] for position in _require_entries(terms, url)]
+    existing = {name.lower() for term_obj in entries for name in term_obj.get('aliases', [])}
+    if alias.lower() not in existing:
+        entries[0].setdefault('aliases', []).append(alias)
+    return entries
+
+
+def remove_alias(terms: List[Dict], url: str, alias: str) -> List[Dict]:
+    """
+    Remove an alias from every entry for a glossary page (compared case-insensitively).
+
+    An entry's main term is still linked even if it is also removed from its aliases.
+
+    Returns:
+        The entries for url
+
+    Raises:
+        GlossaryEntryNotFoundError: If there is no entry for url, or none of them has the alias
+    """
+    entries = [terms[position] for position in _require_entries(terms, url)]
+    found = False
+    for term_obj in entries:
+        aliases = term_obj.get('aliases', [])
+        remaining = [existing for existing in aliases if existing.lower() != alias.lower()]
+        if len(remaining) != len(aliases):
+            term_obj['aliases'] = remaining
+            found = True
+    if not found:
+        raise GlossaryEntryNotFoundError(f"Glossary entry for {url} has no alias {alias!r}")
+    return entries
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+HTML parser backend selection for BeautifulSoup.
+"""
+
+import re
+from typing import List
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+
+DEFAULT_PARSER = 'html.parser'
+
+# Parsers checked against the corpus by test_parser_conformance.py, fastest first
+KNOWN_PARSERS = ('lxml', 'html.parser')
+
+# Document wrapper elements that lxml adds around fragments
+_WRAPPER_TAGS = ('html', 'head', 'body')
+
+
+def available_parsers() -> List[str]:
+    """
+    Get the known HTML parser backends that are installed.
+
+    Returns:
+        List of parser names usable with resolve_parser
+    """
+    return [name for name in KNOWN_PARSERS if builder_registry.lookup(name) is not None]
+
+
+def resolve_parser(name: str = None) -> str:
+    """
+    Check that an HTML parser backend is supported and installed.
+
+    Args:
+        name: 'html.parser' or 'lxml' (defaults to DEFAULT_PARSER)
+
+    Returns:
+        The parser name
+
+    Raises:
+        ValueError: If the backend is not one of KNOWN_PARSERS or is not installed
+    """
+    name = name or DEFAULT_PARSER
+    builder = builder_registry.lookup(name)
+    if name not in KNOWN_PARSERS or builder is None or 'html' not in builder.features:
+        raise ValueError(f"HTML parser {name!r} is not available, expected one of {available_parsers()}")
+    return name
+
+
+def parse_html(content: str, parser: str = DEFAULT_PARSER) -> BeautifulSoup:
+    """
+    Parse an HTML document or fragment.
+
+    Parsers other than html.parser wrap fragments in <html>, <head> and <body>
+    elements. Wrappers that are not in the source are unwrapped again, so
+    str(soup) gives back a fragment for a fragment with every parser.
+
+    Args:
+        content: HTML document or fragment
+        parser: Parser backend name
+
+    Returns:
+        Parsed document
+    """
+    soup = BeautifulSoup(content, parser)
+    if parser != 'html.parser':
+        for name in _WRAPPER_TAGS:
+            tag = soup.find(name)
+            if tag is not None and not re.search(f'<{name}[\\s>/]', content, re.IGNORECASE):
+                tag.unwrap()
+    return soup
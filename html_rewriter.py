@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Streaming HTML rewriter that inserts internal links without building a document tree.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from html import escape, unescape
+from html.parser import HTMLParser
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from span_index import SpanIndex, select_non_overlapping
+
+# Text inside these elements is never linked
+EXCLUDED_TAGS = frozenset({'a', 'script', 'style', 'textarea', 'title'})
+
+# Text runs longer than this are linked and written out in pieces
+MAX_RUN_CHARS = 64 * 1024
+
+# Elements whose start marks a block boundary for on_block
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'dd', 'details', 'div', 'dl', 'dt',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tr', 'ul',
+})
+
+
+@dataclass(frozen=True)
+class LinkEdit:
+    """
+    A link to insert into a source document: the source text at
+    [offset, offset + length) is wrapped in an anchor to href.
+    """
+    offset: int
+    length: int
+    href: str
+    term: str
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.length
+
+
+def format_link(href: str, text: str) -> str:
+    """
+    Markup of an inserted anchor around source text.
+    """
+    return f'<a href="{escape(href)}">{text}</a>'
+
+
+def apply_link_edits(source: str, edits: Sequence[LinkEdit]) -> str:
+    """
+    Insert links into a document in a single left-to-right join.
+
+    Everything outside the inserted anchors is copied unchanged.
+
+    Args:
+        source: Document the edits were computed against
+        edits: Non-overlapping edits sorted by offset
+
+    Returns:
+        The document with the links inserted
+    """
+    pieces = []
+    position = 0
+    for edit in edits:
+        pieces.append(source[position:edit.offset])
+        pieces.append(format_link(edit.href, source[edit.offset:edit.end]))
+        position = edit.end
+    pieces.append(source[position:])
+    return ''.join(pieces)
+
+
+class _AnchorCounter(HTMLParser):
+    """
+    Counts <a> start tags in a document fed in chunks.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.count = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            self.count += 1
+
+
+def count_links(chunks: Iterable[str]) -> int:
+    """
+    Count the existing links of a document without keeping it in memory.
+
+    Args:
+        chunks: Document text in consecutive chunks
+
+    Returns:
+        Number of <a> start tags
+    """
+    counter = _AnchorCounter()
+    for chunk in chunks:
+        counter.feed(chunk)
+    counter.close()
+    return counter.count
+
+
+class StreamingLinkRewriter(HTMLParser):
+    """
+    Inserts internal links into HTML fed in chunks, writing output as it goes.
+
+    The document is tokenized incrementally and never held as a tree. Everything
+    outside the inserted anchors is written exactly as it was read, including
+    attributes, entities and comments. Consecutive text and entity events form a
+    text run; when the run ends it is decoded, matched like a text node of
+    EnhancedInternalLinker.link_html and written back with anchors wrapped around
+    the matched source. Runs inside <a>, <script>, <style> and similar elements
+    are copied unchanged. Every inserted link is also recorded in edits, so the
+    rewriter can run without output to only compute where links go.
+
+    Memory use is bounded by the chunk size plus MAX_RUN_CHARS: runs longer than
+    that are linked and written up to a whitespace boundary, keeping enough text
+    after it that no term starting before the boundary is cut off. Overlapping
+    matches in such a run are resolved per piece rather than across the run.
+
+    If existing_links is not given, existing anchors are counted as they are
+    read, so anchors that come after a text run do not reduce the links added
+    to it. Pass the count (see count_links) to enforce max_links exactly.
+
+    If on_block is given it is called before each block-level start tag (see
+    BLOCK_TAGS), once everything before the tag has been written. The output
+    up to that point is final, so callers can send it on block by block.
+    """
+
+    def __init__(self, linker, write: Optional[Callable[[str], object]], max_links: int = 12,
+                 current_url: Optional[str] = None, existing_links: Optional[int] = None,
+                 max_run_chars: int = MAX_RUN_CHARS, on_block: Optional[Callable[[], object]] = None):
+        """
+        Initialize the rewriter.
+
+        Args:
+            linker: EnhancedInternalLinker providing the term matcher
+            write: Called with each piece of output, in order; None to only
+                collect the edits
+            max_links: Maximum number of links the document may contain
+            current_url: URL of the document itself, excluded from linking
+            existing_links: Number of links already in the document, if known
+            max_run_chars: Length at which a text run is linked in pieces
+            on_block: Called at each block boundary of the output
+        """
+        super().__init__(convert_charrefs=False)
+        self.linker = linker
+        self.write = write
+        self.max_links = max_links
+        self.current_url = current_url.rstrip('/') if current_url else None
+        self.existing_links = existing_links or 0
+        self._count_existing = existing_links is None
+        self.new_links_added = 0
+        # Inserted links, as edits against the source fed so far
+        self.edits: List[LinkEdit] = []
+        self.max_run_chars = max_run_chars
+        self.on_block = on_block
+        self._longest_term = max(linker.term_matcher.term_lengths, default=0)
+        self._used_urls = set()
+        self._excluded: List[str] = []
+
+        # Source text fed but not yet written, starting at absolute offset _source_start
+        self._source = ''
+        self._source_start = 0
+        self._written = 0
+        self._fed = 0
+        # Absolute offsets of line starts, from line number _first_line on
+        self._line_starts = [0]
+        self._first_line = 1
+        # Pending text run: (absolute start, is_entity) for each of its events
+        self._run: List[Tuple[int, bool]] = []
+
+    @property
+    def available_slots(self) -> int:
+        """
+        Number of links that can still be added.
+        """
+        return max(0, self.max_links - self.existing_links - self.new_links_added)
+
+    def feed(self, data: str):
+        """
+        Feed the next chunk of the document.
+        """
+        # Drop source that has been written; only the unwritten tail is kept
+        if self._written > self._source_start:
+            self._source = self._source[self._written - self._source_start:]
+            self._source_start = self._written
+        newline = data.find('\n')
+        while newline != -1:
+            self._line_starts.append(self._fed + newline + 1)
+            newline = data.find('\n', newline + 1)
+        self._source += data
+        self._fed += len(data)
+
+        super().feed(data)
+        if not self._run:
+            self._write_source(self._position())
+
+    def close(self):
+        """
+        Finish the document and write the rest of the output.
+        """
+        super().close()
+        self._flush_run(self._fed)
+        self._write_source(self._fed)
+
+    def _position(self) -> int:
+        """
+        Absolute offset of the parser's current position.
+        """
+        line, column = self.getpos()
+        index = line - self._first_line
+        if index > 1024:
+            # Lines before the current one are never looked up again
+            del self._line_starts[:index]
+            self._first_line = line
+            index = 0
+        return self._line_starts[index] + column
+
+    def _slice(self, start: int, end: int) -> str:
+        return self._source[start - self._source_start:end - self._source_start]
+
+    def _write_source(self, end: int):
+        """
+        Write the source up to an absolute offset.
+        """
+        if end > self._written:
+            if self.write is not None:
+                self.write(self._slice(self._written, end))
+            self._written = end
+
+    # Tokenizer events
+
+    def handle_data(self, data):
+        self._add_to_run(False)
+
+    def handle_entityref(self, name):
+        self._add_to_run(True)
+
+    def handle_charref(self, name):
+        self._add_to_run(True)
+
+    def handle_starttag(self, tag, attrs):
+        position = self._position()
+        self._flush_run(position)
+        if tag == 'a' and self._count_existing:
+            self.existing_links += 1
+        if tag in EXCLUDED_TAGS:
+            self._excluded.append(tag)
+        if tag in BLOCK_TAGS and self.on_block is not None:
+            self._write_source(position)
+            self.on_block()
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_run(self._position())
+        if tag == 'a' and self._count_existing:
+            self.existing_links += 1
+
+    def handle_endtag(self, tag):
+        self._flush_run(self._position())
+        if tag in self._excluded:
+            # Close the element together with any unclosed excluded elements inside it
+            index = len(self._excluded) - 1 - self._excluded[::-1].index(tag)
+            del self._excluded[index:]
+
+    def handle_comment(self, data):
+        self._flush_run(self._position())
+
+    def handle_decl(self, decl):
+        self._flush_run(self._position())
+
+    def handle_pi(self, data):
+        self._flush_run(self._position())
+
+    def unknown_decl(self, data):
+        self._flush_run(self._position())
+
+    # Text runs
+
+    def _add_to_run(self, is_entity: bool):
+        position = self._position()
+        if self._run and position - self._run[0][0] > self.max_run_chars:
+            self._flush_run(position, partial=True)
+        self._run.append((position, is_entity))
+
+    def _flush_run(self, end: int, partial: bool = False):
+        """
+        Link the pending text run and write it out.
+
+        Args:
+            end: Absolute offset where the run ends
+            partial: Write only a prefix of the run, ending at whitespace, and keep
+                the rest pending
+        """
+        if not self._run:
+            return
+        run = self._run
+        self._write_source(run[0][0])
+
+        text, raw_starts, text_starts, entities = self._decode_run(end)
+        cut = len(text)
+        if partial:
+            limit = len(text) - self._longest_term
+            if limit <= 0:
+                return
+            cut = max(text.rfind(' ', 0, limit), text.rfind('\n', 0, limit))
+            if cut <= 0:
+                cut = limit
+
+        links = []
+        if not self._excluded and self.available_slots and text.strip():
+            links = self._select_links(text, cut)
+        if links:
+            cut = max(cut, links[-1]['end'])
+
+        def to_source(offset: int, round_up: bool) -> int:
+            if offset >= len(text):
+                return end
+            index = bisect_right(text_starts, offset) - 1
+            inside = offset - text_starts[index]
+            if entities[index] and inside:
+                # Offsets inside a decoded entity snap to one of its ends
+                if not round_up:
+                    return raw_starts[index]
+                return raw_starts[index + 1] if index + 1 < len(raw_starts) else end
+            return raw_starts[index] + inside
+
+        for link in links:
+            start = to_source(link['start'], False)
+            self._write_source(start)
+            link_end = to_source(link['end'], True)
+            edit = LinkEdit(start, link_end - start, link['url'], link['term'])
+            self.edits.append(edit)
+            if self.write is not None:
+                self.write(format_link(edit.href, self._slice(start, link_end)))
+            self._written = link_end
+        self.new_links_added += len(links)
+
+        if not partial:
+            self._write_source(end)
+            self._run = []
+            return
+
+        # Keep the unwritten tail of the run pending, split at the cut
+        cut_source = max(to_source(cut, False), self._written)
+        self._write_source(cut_source)
+        index = bisect_right(raw_starts, cut_source) - 1
+        rest = run[index:]
+        rest[0] = (cut_source, rest[0][1] if raw_starts[index] == cut_source else False)
+        self._run = rest
+
+    def _decode_run(self, end: int) -> Tuple[str, List[int], List[int], List[bool]]:
+        """
+        Decode the pending run and record where each event starts in source and text.
+        """
+        pieces = []
+        raw_starts = []
+        text_starts = []
+        entities = []
+        length = 0
+        run = self._run
+        for index, (start, is_entity) in enumerate(run):
+            stop = run[index + 1][0] if index + 1 < len(run) else end
+            raw = self._slice(start, stop)
+            piece = unescape(raw) if is_entity else raw
+            raw_starts.append(start)
+            text_starts.append(length)
+            entities.append(is_entity)
+            pieces.append(piece)
+            length += len(piece)
+        return ''.join(pieces), raw_starts, text_starts, entities
+
+    def _select_links(self, text: str, cut: int) -> List[dict]:
+        """
+        Pick the links for a decoded text run, like link_html does for a text node.
+
+        Only matches starting before cut are considered.
+        """
+        linker = self.linker
+        occurrences = {}
+        for term_index, starts in linker.term_matcher.find_occurrences(text.lower()).items():
+            starts = [start for start in starts if start < cut]
+            if starts:
+                occurrences[term_index] = starts
+        remaining = self.available_slots
+        matches = linker._select_term_matches(text, self._used_urls, SpanIndex(), remaining,
+                                              self.current_url, occurrences)
+        match_objs = [
+            {'start': start, 'end': end, 'term': term, 'url': url, 'length': end - start}
+            for term, url, start, end in matches
+        ]
+        return select_non_overlapping(match_objs, limit=remaining)
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Execution layer that keeps CPU-bound linking work off the asyncio event loop.
+"""
+
+import asyncio
+import copy
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+import logging
+
+from enhanced_internal_linking import EnhancedInternalLinker, LinkingResult
+from glossary_store import write_glossary
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('thread', 'process')
+
+# Linkers of a worker process of the process backend by glossary version, most recently used last
+_worker_linkers: "OrderedDict[str, EnhancedInternalLinker]" = OrderedDict()
+_worker_config: Tuple[str, str, str, str] = ('', '', '', '')
+
+# Glossary versions a worker process keeps a linker for, so requests still on the
+# previous snapshot after a reload do not make it load the glossary again
+WORKER_LINKER_VERSIONS = 2
+
+
+class GlossarySnapshotError(Exception):
+    """Raised in a worker process when the glossary snapshot of a version cannot be loaded."""
+
+
+def snapshot_path(snapshot_dir: str, glossary_version: str) -> str:
+    """
+    Get the path of the glossary snapshot of a version, as written for worker processes.
+    """
+    return os.path.join(snapshot_dir, f'{glossary_version}.json')
+
+
+def _init_worker(snapshot_dir: str, index_file: str, nlp_model: str, parser: str):
+    """
+    Set up a worker process to load the glossary snapshots of its calls.
+
+    The pool starts processes on demand, possibly long after the glossary it was
+    created with has been replaced, so a worker loads nothing until warm_up or its
+    first call names a version.
+    """
+    global _worker_config
+    _worker_config = (snapshot_dir, index_file, nlp_model, parser)
+
+
+def _worker_linker(glossary_version: str) -> EnhancedInternalLinker:
+    """
+    Get this worker process's linker for a glossary version.
+
+    A version the worker has not seen yet is loaded from its snapshot, which is
+    never changed once written, so the linker has exactly the glossary of the
+    request's snapshot even if the glossary file has changed since. The shared
+    index is used with it, as is if the snapshot is the glossary it was compiled
+    from, and otherwise with only the changed terms built on top.
+
+    Raises:
+        GlossarySnapshotError: If the snapshot is missing or is of another version
+    """
+    linker = _worker_linkers.get(glossary_version)
+    if linker is None:
+        snapshot_dir, index_file, nlp_model, parser = _worker_config
+        glossary_file = snapshot_path(snapshot_dir, glossary_version)
+        if not os.path.exists(glossary_file):
+            raise GlossarySnapshotError(f"No glossary snapshot for version {glossary_version}")
+        linker = EnhancedInternalLinker(glossary_file, nlp_model=nlp_model, parser=parser, index_file=index_file)
+        if linker.glossary_version != glossary_version:
+            raise GlossarySnapshotError(f"Glossary snapshot {glossary_file} has version {linker.glossary_version}")
+        _worker_linkers[glossary_version] = linker
+        while len(_worker_linkers) > WORKER_LINKER_VERSIONS:
+            _worker_linkers.popitem(last=False)
+    _worker_linkers.move_to_end(glossary_version)
+    return linker
+
+
+def _worker_ready(glossary_version: str) -> int:
+    """
+    Task used to start and warm up a worker process, loading the given glossary version.
+    """
+    _worker_linker(glossary_version)
+    return os.getpid()
+
+
+def _link_in_worker(glossary_version: str, content: str, max_links: int, current_url: Optional[str]) -> LinkingResult:
+    return _worker_linker(glossary_version).link_html(content, max_links=max_links, current_url=current_url)
+
+
+def _link_bytes_in_worker(glossary_version: str, data: bytes, max_links: int,
+                          current_url: Optional[str]) -> LinkingResult:
+    return _worker_linker(glossary_version).link_file(io.BytesIO(data), max_links=max_links, current_url=current_url)
+
+
+def _link_blocks_in_worker(glossary_version: str, content: str, max_links: int,
+                           current_url: Optional[str]) -> Tuple[List[str], LinkingResult]:
+    blocks = []
+    result = _worker_linker(glossary_version).link_html_blocks(content, blocks.append, max_links=max_links,
+                                                               current_url=current_url)
+    return blocks, result
+
+
+def _find_edits_in_worker(glossary_version: str, content: str, max_links: int,
+                          current_url: Optional[str]) -> LinkingResult:
+    return _worker_linker(glossary_version).find_link_edits(content, max_links=max_links, current_url=current_url)
+
+
+def _analyze_in_worker(glossary_version: str, content: str) -> Dict:
+    return _worker_linker(glossary_version).analyze_html(content)
+
+
+class _WorkerPool:
+    """
+    Worker pool shared by the executors of successive glossary snapshots.
+
+    Calls pending on the pool are counted here, so the queue limit holds across
+    snapshots, and the pool is shut down with the last executor using it. For
+    worker processes, the glossary of every snapshot in use is written to
+    snapshot_dir, named by its version, and removed with the last executor using it.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None):
+        self.pool = None
+        self.snapshot_dir = snapshot_dir
+        self.pending = 0
+        self.executors = 0
+        self._snapshots: Dict[str, int] = {}
+        # Executors are added from a thread during reloads and detached on the event loop
+        self._lock = threading.Lock()
+
+    def attach(self, linker: EnhancedInternalLinker):
+        with self._lock:
+            self.executors += 1
+            version = linker.glossary_version
+            if self.snapshot_dir is None:
+                return
+            if not self._snapshots.get(version):
+                # Written in the glossary file's format, so a snapshot of the glossary
+                # the index was compiled from matches the index's checksum
+                write_glossary(snapshot_path(self.snapshot_dir, version), list(linker.glossary_terms))
+            self._snapshots[version] = self._snapshots.get(version, 0) + 1
+
+    def detach(self, linker: EnhancedInternalLinker, wait: bool):
+        with self._lock:
+            self.executors -= 1
+            if not self.executors:
+                self.pool.shutdown(wait=wait)
+                if self.snapshot_dir is not None:
+                    shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+            elif self.snapshot_dir is not None:
+                version = linker.glossary_version
+                self._snapshots[version] -= 1
+                if not self._snapshots[version]:
+                    del self._snapshots[version]
+                    os.unlink(snapshot_path(self.snapshot_dir, version))
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the linking queue is full and a request cannot be accepted."""
+
+
+class LinkingExecutor:
+    """
+    Runs linker calls in a bounded worker pool.
+
+    At most max_workers calls run at once and at most queue_depth more wait for a
+    worker; further calls are rejected with ExecutorBusyError instead of piling up.
+
+    The thread backend shares one linker between worker threads. The process
+    backend gives every worker process its own linker, built when the worker
+    starts, so linking scales across cores; only the article, the options and the
+    glossary version are sent to the worker, which loads each version from an
+    immutable snapshot of that glossary. Executors made with with_linker share
+    their workers.
+    """
+
+    def __init__(self, linker: EnhancedInternalLinker, max_workers: Optional[int] = None, queue_depth: int = 32,
+                 backend: str = 'thread'):
+        """
+        Initialize the executor.
+
+        Args:
+            linker: Linker used by the thread backend; the process backend builds
+                worker linkers from its glossary file, spaCy model and parser
+            max_workers: Number of workers (defaults to the CPU count, at most 4 threads)
+            queue_depth: Number of calls allowed to wait for a free worker
+            backend: 'thread' or 'process'
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown executor backend {backend!r}, expected one of {BACKENDS}")
+
+        self.backend = backend
+        self.queue_depth = queue_depth
+        if backend == 'process':
+            self.max_workers = max_workers or os.cpu_count() or 1
+            workers = _WorkerPool(tempfile.mkdtemp(prefix='linker-glossary-'))
+            self._use_linker(linker, workers)
+            # Spawned workers do not inherit the server's threads or event loop
+            workers.pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(workers.snapshot_dir, linker.index_file, linker.nlp_model, linker.parser)
+            )
+        else:
+            self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+            workers = _WorkerPool()
+            self._use_linker(linker, workers)
+            workers.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='linker')
+        logger.info(f"Linking executor started with {self.max_workers} {backend} workers (queue depth {self.queue_depth})")
+
+    def _use_linker(self, linker: EnhancedInternalLinker, workers: _WorkerPool):
+        workers.attach(linker)
+        self.linker = linker
+        self._workers = workers
+        self._leases = 0
+        self._retired = False
+        self._closed = False
+        if self.backend == 'process':
+            # Worker processes pick the linker for the snapshot's glossary version
+            self._link = partial(_link_in_worker, linker.glossary_version)
+            self._link_bytes = partial(_link_bytes_in_worker, linker.glossary_version)
+            self._link_blocks = partial(_link_blocks_in_worker, linker.glossary_version)
+            self._find_edits = partial(_find_edits_in_worker, linker.glossary_version)
+            self._analyze = partial(_analyze_in_worker, linker.glossary_version)
+        else:
+            self._link = linker.link_html
+            self._find_edits = linker.find_link_edits
+            self._analyze = linker.analyze_html
+
+    @classmethod
+    def from_env(cls, linker: EnhancedInternalLinker) -> 'LinkingExecutor':
+        """
+        Create an executor configured by the LINKER_BACKEND, LINKER_WORKERS and
+        LINKER_QUEUE_DEPTH environment variables.
+        """
+        backend = os.environ.get('LINKER_BACKEND', 'thread')
+        max_workers = int(os.environ.get('LINKER_WORKERS', 0)) or None
+        queue_depth = int(os.environ.get('LINKER_QUEUE_DEPTH', 32))
+        return cls(linker, max_workers=max_workers, queue_depth=queue_depth, backend=backend)
+
+    def with_linker(self, linker: EnhancedInternalLinker) -> 'LinkingExecutor':
+        """
+        Create an executor for another linker of the same glossary file that shares this executor's workers.
+
+        Thread workers call the new linker directly. Worker processes keep running
+        and load the new glossary version from its snapshot on its first call (or
+        in warm_up), so a reload starts no new processes. The workers are shut
+        down once every executor sharing them has been shut down.
+
+        For worker processes this writes the glossary snapshot, so call it in a
+        thread (as GlossaryReloader does) rather than on the event loop.
+        """
+        executor = copy.copy(self)
+        executor._use_linker(linker, self._workers)
+        return executor
+
+    def acquire(self):
+        """
+        Take a lease on the executor for the duration of a request.
+
+        A retired executor keeps accepting calls until every lease is released.
+        """
+        self._leases += 1
+
+    def release(self):
+        """
+        Release a lease taken with acquire.
+        """
+        self._leases -= 1
+        if self._retired and not self._leases:
+            self.shutdown(wait=False)
+
+    def retire(self):
+        """
+        Shut the executor down once the last lease is released; calls already submitted still complete.
+        """
+        self._retired = True
+        if not self._leases:
+            self.shutdown(wait=False)
+
+    async def warm_up(self):
+        """
+        Start the workers and load this executor's glossary ahead of the first request.
+
+        Worker processes load the glossary when they start, and again when a reload
+        brings a new glossary version, so this moves that cost to server startup or
+        to the reload. It submits one warm-up call per worker, but the pool may
+        hand several of them to the same process; every call checks the version it
+        needs and a worker that missed the warm-up loads it on its first call, so
+        this only affects latency. Thread workers need no warm-up.
+        """
+        if self.backend != 'process':
+            return
+        loop = asyncio.get_running_loop()
+        ready = partial(_worker_ready, self.linker.glossary_version)
+        pids = await asyncio.gather(*[loop.run_in_executor(self._workers.pool, ready) for _ in range(self.max_workers)])
+        logger.info(f"Warmed up {len(set(pids))} linking worker processes")
+
+    def submit(self, func: Callable, *args, **kwargs) -> asyncio.Future:
+        """
+        Start a blocking call on the worker pool.
+
+        The call counts towards the queue until it finishes, even if nobody
+        awaits the returned future any more.
+
+        Returns:
+            Future resolving to the call's result
+
+        Raises:
+            ExecutorBusyError: If all workers are busy and the queue is full
+        """
+        if self._closed:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        workers = self._workers
+        if workers.pending >= self.max_workers + self.queue_depth:
+            raise ExecutorBusyError(f"Linking queue is full ({workers.pending} requests pending)")
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(workers.pool, partial(func, *args, **kwargs))
+        workers.pending += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: asyncio.Future):
+        self._workers.pending -= 1
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Run a blocking call on the worker pool and wait for its result.
+
+        Raises:
+            ExecutorBusyError: If all workers are busy and the queue is full
+        """
+        return await self.submit(func, *args, **kwargs)
+
+    async def link_html(self, content: str, max_links: int = 12, current_url: Optional[str] = None) -> LinkingResult:
+        """
+        Insert internal links into article content on a worker.
+        """
+        return await self.run(self._link, content, max_links, current_url)
+
+    async def link_file(self, file: BinaryIO, max_links: int = 12, current_url: Optional[str] = None) -> LinkingResult:
+        """
+        Insert internal links into an article read from a seekable binary file on a worker.
+
+        Thread workers stream the file through the linker in chunks. File objects
+        cannot be sent to worker processes, so the process backend reads the file
+        (in a thread, off the event loop) and sends its bytes instead.
+        """
+        if self.backend == 'process':
+            data = await asyncio.to_thread(file.read)
+            return await self.run(self._link_bytes, data, max_links, current_url)
+        return await self.run(self.linker.link_file, file, max_links, current_url)
+
+    def start_link_blocks(self, content: str, emit: Callable[[str], object], max_links: int = 12,
+                          current_url: Optional[str] = None) -> asyncio.Future:
+        """
+        Start inserting internal links into article content on a worker, emitting
+        the linked HTML block by block (see EnhancedInternalLinker.link_html_blocks).
+
+        emit is called on the event loop, in order, and every block has been
+        emitted by the time the returned future resolves. Thread workers hand each
+        block over as soon as it is linked; worker processes send all blocks back
+        together once the article is done.
+
+        Returns:
+            Future resolving to the LinkingResult
+
+        Raises:
+            ExecutorBusyError: If all workers are busy and the queue is full
+        """
+        if self.backend == 'process':
+            linking = self.submit(self._link_blocks, content, max_links, current_url)
+
+            async def relay() -> LinkingResult:
+                blocks, result = await linking
+                for block in blocks:
+                    emit(block)
+                return result
+
+            return asyncio.ensure_future(relay())
+
+        loop = asyncio.get_running_loop()
+        return self.submit(self.linker.link_html_blocks, content,
+                           lambda block: loop.call_soon_threadsafe(emit, block), max_links, current_url)
+
+    async def find_link_edits(self, content: str, max_links: int = 12, current_url: Optional[str] = None) -> LinkingResult:
+        """
+        Find where links should be inserted into article content on a worker.
+        """
+        return await self.run(self._find_edits, content, max_links, current_url)
+
+    async def analyze_html(self, content: str) -> Dict:
+        """
+        Find internal linking opportunities in article content on a worker.
+        """
+        return await self.run(self._analyze, content)
+
+    def get_statistics(self) -> Dict:
+        """
+        Get the size and current load of the executor.
+        """
+        return {
+            'backend': self.backend,
+            'max_workers': self.max_workers,
+            'queue_depth': self.queue_depth,
+            'pending': self._workers.pending
+        }
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting calls, and stop the workers unless another executor still shares them.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._workers.detach(self.linker, wait)
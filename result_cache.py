@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Content-addressed LRU cache for linking and analysis results.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    LRU cache keyed by a hash of the request content, its options and the glossary version.
+
+    Entries are evicted least recently used first once either the entry limit or the
+    size limit is exceeded. Only results for the glossary version being served are
+    cached: when set_glossary_version moves to a new version every entry is dropped,
+    and lookups and results of requests still running on an older version bypass
+    the cache.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached results (0 disables the cache)
+            max_bytes: Maximum total size of cached results
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.glossary_version: Optional[str] = None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(kind: str, content: str, glossary_version: str, **options) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            kind: Operation name, e.g. 'process' or 'analyze'
+            content: Article content
+            glossary_version: Version of the glossary the result was computed with
+            **options: Request options that affect the result (max_links, current_url, ...)
+
+        Returns:
+            SHA-256 hex digest of the content, options and glossary version
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{kind}\0{glossary_version}\0{sorted(options.items())!r}\0".encode('utf-8'))
+        digest.update(content.encode('utf-8'))
+        return digest.hexdigest()
+
+    def set_glossary_version(self, glossary_version: str):
+        """
+        Serve results for a glossary version, dropping the results cached for any other.
+
+        Args:
+            glossary_version: Version of the glossary new requests are linked with
+        """
+        with self._lock:
+            if glossary_version == self.glossary_version:
+                return
+            if self._entries:
+                logger.info(f"Glossary changed to {glossary_version}, dropping {len(self._entries)} cached results")
+            self._entries.clear()
+            self._bytes = 0
+            self.glossary_version = glossary_version
+
+    def get(self, key: str, glossary_version: str) -> Optional[Any]:
+        """
+        Look up a cached result and mark it as recently used.
+
+        Args:
+            key: Cache key from make_key
+            glossary_version: Version of the glossary the request is linked with
+
+        Returns:
+            The cached result, or None on a miss or for a version other than the served one
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if glossary_version != self.glossary_version:
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int, glossary_version: str):
+        """
+        Store a result, evicting least recently used entries as needed.
+
+        Results computed with a version other than the served one are not stored.
+
+        Args:
+            key: Cache key from make_key
+            value: Result to cache
+            size: Approximate size of the result in bytes
+            glossary_version: Version of the glossary the result was computed with
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if glossary_version != self.glossary_version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every cached result.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_statistics(self) -> Dict:
+        """
+        Get cache size and hit/miss counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'glossary_version': self.glossary_version
+        }
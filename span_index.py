@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Interval structures for overlap checks between text spans.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SpanIndex:
+    """
+    Static index over (start, end) spans that may overlap each other.
+
+    Spans are sorted by start once, together with the running maximum of their
+    ends, so an overlap query is a single binary search.
+    """
+
+    def __init__(self, spans: Iterable[Tuple[int, int]] = ()):
+        """
+        Build the index.
+
+        Args:
+            spans: (start, end) spans, in any order
+        """
+        ordered = sorted(spans)
+        self._starts: List[int] = [start for start, _ in ordered]
+        self._max_ends: List[int] = []
+        max_end = None
+        for _, end in ordered:
+            max_end = end if max_end is None else max(max_end, end)
+            self._max_ends.append(max_end)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """
+        Check whether [start, end) overlaps any indexed span.
+
+        Args:
+            start: Start position of the query span
+            end: End position of the query span
+
+        Returns:
+            True if some span has span_start < end and span_end > start
+        """
+        # Spans starting before `end` are a prefix of the sorted list
+        count = bisect_left(self._starts, end)
+        return count > 0 and self._max_ends[count - 1] > start
+
+
+class SpanSet:
+    """
+    Growing set of non-overlapping (start, end) spans.
+
+    Used for matches that have already been selected: because the spans never
+    overlap, only the closest span starting before a query's end can overlap it.
+    """
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """
+        Check whether [start, end) overlaps any span in the set.
+        """
+        count = bisect_left(self._starts, end)
+        return count > 0 and self._ends[count - 1] > start
+
+    def add(self, start: int, end: int):
+        """
+        Add a span that does not overlap any span already in the set, in O(k) for k spans held.
+        """
+        index = bisect_left(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+
+
+def select_non_overlapping(matches: Iterable[Dict], limit: Optional[int] = None) -> List[Dict]:
+    """
+    Select a set of non-overlapping matches, preferring longer matches and then earlier ones.
+
+    Matches are sorted once by (-length, start) and swept greedily; each candidate
+    is checked against the selected spans with a binary search. Only selected
+    matches are inserted, so for n candidates and k selections the sweep is
+    O(n log n + k^2), and k is bounded by limit (the link budget) when given.
+
+    Args:
+        matches: Match dicts with 'start', 'end' and 'length' keys
+        limit: Stop once this many matches are selected (None for no limit)
+
+    Returns:
+        Selected matches sorted by start position
+    """
+    selected = []
+    if limit is not None and limit <= 0:
+        return selected
+    occupied = SpanSet()
+    for match in sorted(matches, key=lambda m: (-m['length'], m['start'])):
+        if occupied.overlaps(match['start'], match['end']):
+            continue
+        selected.append(match)
+        occupied.add(match['start'], match['end'])
+        if limit is not None and len(selected) >= limit:
+            break
+    selected.sort(key=lambda m: m['start'])
+    return selected
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern term matching for the internal linker.
+"""
+
+import heapq
+from array import array
+from collections import deque
+from itertools import chain
+from operator import itemgetter
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Sequence, Tuple
+
+
+class TermTable:
+    """
+    Immutable, length-ordered table of glossary terms and their URLs.
+
+    Terms are ordered longest first (ties keep glossary order), so a term's
+    index is also its linking priority. The table is built once per glossary
+    load and can be shared by every matcher and request.
+    """
+
+    __slots__ = ('terms', 'urls', 'ranks')
+
+    def __init__(self, term_to_url_map: Mapping[str, str]):
+        """
+        Build the table.
+
+        Args:
+            term_to_url_map: Mapping from lowercase terms/aliases to URLs
+        """
+        ordered = sorted(term_to_url_map.keys(), key=len, reverse=True)
+        self.terms: Tuple[str, ...] = tuple(ordered)
+        self.urls: Tuple[str, ...] = tuple(term_to_url_map[term] for term in ordered)
+        self.ranks: Mapping[str, int] = MappingProxyType({term: index for index, term in enumerate(ordered)})
+
+    @classmethod
+    def from_columns(cls, terms: Sequence[str], urls: Sequence[str], ranks: Mapping[str, int]) -> 'TermTable':
+        """
+        Wrap columns that are already length-ordered, such as views into a compiled index.
+
+        Args:
+            terms: Terms, longest first
+            urls: URL of each term
+            ranks: Mapping from each term to its index
+        """
+        table = cls.__new__(cls)
+        table.terms = terms
+        table.urls = urls
+        table.ranks = ranks
+        return table
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.terms, self.urls)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        super().__setattr__(name, value)
+
+
+class TermMatcher:
+    """
+    Base class of the term matchers: scans text for every occurrence of a fixed set of terms.
+    """
+
+    terms: Sequence[str]
+    term_lengths: Sequence[int]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Scan the text once and yield every term occurrence.
+
+        Args:
+            text: Lowercased text to scan
+
+        Yields:
+            (start, end, term_index) tuples in order of their end position
+        """
+        raise NotImplementedError
+
+    def find_occurrences(self, text: str) -> Dict[int, List[int]]:
+        """
+        Group all occurrences in the text by term.
+
+        Args:
+            text: Lowercased text to scan
+
+        Returns:
+            Dictionary mapping term index to the sorted start positions of that term
+        """
+        occurrences: Dict[int, List[int]] = {}
+        for start, _, term_index in self.iter_matches(text):
+            occurrences.setdefault(term_index, []).append(start)
+        return occurrences
+
+
+class AhoCorasickMatcher(TermMatcher):
+    """
+    Aho-Corasick automaton over a fixed set of lowercase glossary terms.
+
+    The automaton is built once and then scans any text in a single pass,
+    reporting every occurrence of every term regardless of how many terms
+    the glossary contains.
+    """
+
+    def __init__(self, terms: Sequence[str]):
+        """
+        Build the automaton.
+
+        Args:
+            terms: Lowercase terms to match. A term's index in this sequence is
+                the id reported for its occurrences.
+        """
+        self.terms = tuple(terms)
+        self.term_lengths = tuple(len(term) for term in self.terms)
+        # State 0 is the root. For every state we keep its outgoing edges, its
+        # failure link, the term ending exactly there (-1 if none) and the
+        # nearest state along the failure chain that ends a term (0 if none).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._term_at: List[int] = [-1]
+        self._output_link: List[int] = [0]
+        self._build()
+
+    def _build(self):
+        """
+        Build the trie and compute failure and output links breadth-first.
+        """
+        goto = self._goto
+        for term_index, term in enumerate(self.terms):
+            if not term:
+                continue
+            state = 0
+            for char in term:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    self._fail.append(0)
+                    self._term_at.append(-1)
+                    self._output_link.append(0)
+                state = next_state
+            if self._term_at[state] == -1:
+                self._term_at[state] = term_index
+
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                fail_target = goto[fail_state].get(char, 0)
+                if fail_target == next_state:
+                    fail_target = 0
+                self._fail[next_state] = fail_target
+                self._output_link[next_state] = (
+                    fail_target if self._term_at[fail_target] != -1 else self._output_link[fail_target]
+                )
+
+    @property
+    def state_count(self) -> int:
+        """
+        Number of states in the automaton.
+        """
+        return len(self._goto)
+
+    def to_dense(self) -> 'DenseAhoCorasickMatcher':
+        """
+        Fold the failure links into a dense transition table over the terms' alphabet.
+
+        Returns:
+            Matcher reporting the same occurrences, with array-backed tables
+        """
+        alphabet = sorted({char for term in self.terms for char in term})
+        width = len(alphabet)
+        state_count = self.state_count
+        typecode = 'H' if state_count <= 0x7FFF else 'I'
+        # The lowest bit of a transition marks target states where some term ends
+        reports = [int(term_index != -1 or link != 0) for term_index, link in zip(self._term_at, self._output_link)]
+        transitions = array(typecode, bytes(state_count * width * array(typecode).itemsize))
+
+        # Breadth-first, so a state's failure target is always filled in before it
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            edges = self._goto[state]
+            queue.extend(edges.values())
+            base = state * width
+            fail_base = self._fail[state] * width
+            for column, char in enumerate(alphabet):
+                target = edges.get(char)
+                if target is None:
+                    transitions[base + column] = transitions[fail_base + column] if state else 0
+                else:
+                    transitions[base + column] = target << 1 | reports[target]
+
+        return DenseAhoCorasickMatcher(
+            self.terms, array('I', self.term_lengths), array('I', [ord(char) for char in alphabet]),
+            transitions, array('i', self._term_at), array(typecode, self._output_link)
+        )
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        goto = self._goto
+        fail = self._fail
+        term_at = self._term_at
+        output_link = self._output_link
+        lengths = self.term_lengths
+
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not state:
+                continue
+            match_state = state if term_at[state] != -1 else output_link[state]
+            while match_state:
+                term_index = term_at[match_state]
+                end = position + 1
+                yield end - lengths[term_index], end, term_index
+                match_state = output_link[match_state]
+
+
+class DenseAhoCorasickMatcher(TermMatcher):
+    """
+    Aho-Corasick automaton stored as flat arrays, for example views into a
+    memory-mapped glossary index.
+
+    Failure links are folded into a dense (state x alphabet) transition table, so
+    scanning costs one table lookup per character; characters outside the terms'
+    alphabet lead back to the root. Each transition holds the target state shifted
+    left by one, with the lowest bit set when a term ends at the target, so the
+    output tables are only read where something matches. Built with AhoCorasickMatcher.to_dense and
+    reports exactly the same occurrences.
+    """
+
+    def __init__(self, terms: Sequence[str], term_lengths: Sequence[int], alphabet: Sequence[int],
+                 transitions: Sequence[int], term_at: Sequence[int], output_link: Sequence[int]):
+        """
+        Wrap the tables of a dense automaton.
+
+        Args:
+            terms: Matched terms, indexed by term id
+            term_lengths: Length of each term
+            alphabet: Sorted code points of the characters occurring in the terms
+            transitions: Next state and output bit for each (state, alphabet column), row by row
+            term_at: Term ending at each state (-1 if none)
+            output_link: Nearest term-ending state along each failure chain (0 if none)
+        """
+        self.terms = terms
+        self.term_lengths = term_lengths
+        self.alphabet = alphabet
+        self.transitions = transitions
+        self.term_at = term_at
+        self.output_link = output_link
+        self._columns = {chr(code): column for column, code in enumerate(alphabet)}
+
+    @property
+    def state_count(self) -> int:
+        """
+        Number of states in the automaton.
+        """
+        return len(self.term_at)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        columns = self._columns
+        width = len(columns)
+        transitions = self.transitions
+        term_at = self.term_at
+        output_link = self.output_link
+        lengths = self.term_lengths
+
+        state = 0
+        for position, char in enumerate(text):
+            column = columns.get(char)
+            if column is None:
+                state = 0
+                continue
+            step = transitions[state * width + column]
+            state = step >> 1
+            if not step & 1:
+                continue
+            match_state = state if term_at[state] != -1 else output_link[state]
+            while match_state:
+                term_index = term_at[match_state]
+                end = position + 1
+                yield end - lengths[term_index], end, term_index
+                match_state = output_link[match_state]
+
+
+class LayeredTermMatcher(TermMatcher):
+    """
+    A prebuilt base matcher plus a small delta matcher for the terms added since,
+    together matching the terms of a newer TermTable.
+
+    The base automaton is reused as it is, typically the dense one of a compiled
+    glossary index: occurrences it reports are renumbered to the new table, and
+    base terms that are no longer in the table (tombstones) are dropped. Only the
+    added terms get a new automaton, so applying a glossary change costs time in
+    proportion to the change rather than to the glossary. Reports exactly the same
+    occurrences as a matcher built over the whole table.
+    """
+
+    def __init__(self, term_table: TermTable, base: TermMatcher):
+        """
+        Build the delta over a base matcher.
+
+        Args:
+            term_table: Table of the current terms; occurrences are reported with its indexes
+            base: Matcher over an earlier set of terms
+        """
+        self.terms = term_table.terms
+        self.term_lengths = tuple(len(term) for term in self.terms)
+        self.base = base
+        ranks = term_table.ranks
+        base_terms = list(base.terms)
+        # Index in the new table of each base term, -1 for removed terms
+        self.base_ids = array('i', [ranks.get(term, -1) for term in base_terms])
+        known = set(base_terms)
+        added = [term for term in self.terms if term not in known]
+        self.delta = AhoCorasickMatcher(added)
+        self.delta_ids = array('i', [ranks[term] for term in added])
+
+    @property
+    def added_terms(self) -> int:
+        """
+        Number of terms matched by the delta automaton.
+        """
+        return len(self.delta_ids)
+
+    @property
+    def removed_terms(self) -> int:
+        """
+        Number of base terms that are no longer matched.
+        """
+        return self.base_ids.count(-1)
+
+    def _layer_matches(self, matcher: TermMatcher, ids: Sequence[int], text: str) -> Iterator[Tuple[int, int, int]]:
+        for start, end, term_index in matcher.iter_matches(text):
+            term_index = ids[term_index]
+            if term_index != -1:
+                yield start, end, term_index
+
+    def _layers(self, text: str) -> List[Iterator[Tuple[int, int, int]]]:
+        layers = [self._layer_matches(self.base, self.base_ids, text)]
+        if self.delta_ids:
+            layers.append(self._layer_matches(self.delta, self.delta_ids, text))
+        return layers
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        return heapq.merge(*self._layers(text), key=itemgetter(1))
+
+    def find_occurrences(self, text: str) -> Dict[int, List[int]]:
+        # Every term is in exactly one layer, so the layers need no merging here
+        occurrences: Dict[int, List[int]] = {}
+        for start, _, term_index in chain.from_iterable(self._layers(text)):
+            occurrences.setdefault(term_index, []).append(start)
+        return occurrences
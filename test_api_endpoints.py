@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Test script for the HTTP endpoints of the internal linking API.
+"""
+
+import asyncio
+import io
+import json
+import shutil
+import tarfile
+import zipfile
+
+from fastapi.testclient import TestClient
+
+import api_internal_linking as api
+from enhanced_internal_linking import EnhancedInternalLinker
+from glossary_reload import GlossaryReloader
+from html_rewriter import LinkEdit, apply_link_edits
+from linking_executor import LinkingExecutor
+from test_glossary_index import make_glossary_dir
+from test_glossary_reload import CONTENT
+
+# Requests are made without entering the app's lifespan, so the reloader is
+# built here and its worker pool stays up for every test in the module
+api.reloader = api.create_reloader()
+client = TestClient(api.app)
+
+
+def read_article(name):
+    """Read an article of the test corpus."""
+    with open(f'Articles/{name}', 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_raw_body_matches_json_body():
+    """A text/html body with options in the query or headers is linked like the same JSON request."""
+    content = read_article('buffet-pile')
+    expected = client.post('/process', json={'content': content, 'max_links': 5})
+    assert expected.status_code == 200 and expected.json()['new_links_added'] == 5
+
+    raw = client.post('/process?max_links=5', content=content.encode('utf-8'),
+                      headers={'Content-Type': 'text/html; charset=utf-8'})
+    assert raw.status_code == 200 and raw.json() == expected.json()
+    raw = client.post('/process', content=content.encode('utf-8'),
+                      headers={'Content-Type': 'application/octet-stream', 'X-Max-Links': '5'})
+    assert raw.status_code == 200 and raw.json() == expected.json()
+
+    analyzed = client.post('/analyze', json={'content': content}).json()
+    raw = client.post('/analyze', content=content.encode('utf-8'), headers={'Content-Type': 'text/html'})
+    assert raw.status_code == 200 and raw.json() == analyzed and analyzed['total_matches'] > 0
+
+
+def test_raw_body_errors():
+    """An unknown charset or undecodable body is a 400, an invalid option a 422."""
+    response = client.post('/process', content=b'<p>Inflation</p>',
+                           headers={'Content-Type': 'text/html; charset=no-such-charset'})
+    assert response.status_code == 400
+    response = client.post('/process', content=b'<p>\xff Inflation</p>', headers={'Content-Type': 'text/html'})
+    assert response.status_code == 400
+    response = client.post('/process?max_links=lots', content=b'<p>Inflation</p>',
+                           headers={'Content-Type': 'text/html'})
+    assert response.status_code == 422
+
+
+def test_process_stream_blocks_join_to_patch_output():
+    """The streamed blocks join to the patch-mode article and end with a summary line."""
+    content = read_article('revenue')
+    expected = client.post('/process', json={'content': content, 'max_links': 8, 'response_mode': 'patch'}).json()
+    response = client.post('/process/stream', json={'content': content, 'max_links': 8})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    summary = lines.pop()['summary']
+    assert len(lines) > 1 and all(set(line) == {'html'} for line in lines)
+    assert summary['new_links_added'] == expected['new_links_added'] > 0
+
+    edits = [LinkEdit(insertion['offset'], insertion['length'], insertion['url'], insertion['term'])
+             for insertion in expected['insertions']]
+    linked = ''.join(line['html'] for line in lines)
+    # The article's current_url directive line is not streamed back
+    assert content.startswith('{current_url') and apply_link_edits(content, edits).endswith(linked)
+    assert linked.startswith('<p>')
+
+
+def test_process_stream_keeps_snapshot_until_finished():
+    """A reload during /process/stream retires the old snapshot only after the stream has been sent."""
+    reloader = GlossaryReloader(LinkingExecutor(api.reloader.linker, max_workers=1))
+    old = reloader.current
+    served_during_stream = []
+    original = api.reloader, api.stream_linked_blocks
+
+    async def reload_during_stream(*args):
+        async for line in original[1](*args):
+            if not served_during_stream:
+                await reloader.reload(force=True)
+                served_during_stream.append(await old.link_html('<p>Bonds and inflation</p>'))
+            yield line
+
+    api.reloader, api.stream_linked_blocks = reloader, reload_during_stream
+    try:
+        response = client.post('/process/stream', json={'content': read_article('revenue'), 'max_links': 8})
+    finally:
+        api.reloader, api.stream_linked_blocks = original
+        reloader.current.shutdown()
+    assert response.status_code == 200 and 'summary' in json.loads(response.text.splitlines()[-1])
+    assert reloader.current is not old and served_during_stream[0].new_links_added == 2
+    # Once the stream is done, the retired snapshot's pool is shut down
+    try:
+        asyncio.run(old.link_html('<p>Bonds and inflation</p>'))
+        assert False, "retired snapshot should not accept work"
+    except RuntimeError:
+        pass
+
+
+def test_batch_reports_errors_per_item():
+    """A batch links valid articles and reports invalid ones without failing the others."""
+    items = [{'content': read_article('buffet-pile'), 'max_links': 3},
+             {'max_links': 3},
+             {'content': '<p>Inflation and bonds</p>', 'max_links': 'many'},
+             'not an article']
+    response = client.post('/process/batch', json={'items': items})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['succeeded'], body['failed']) == (1, 3)
+    results = {result['index']: result for result in body['results']}
+    assert results[0]['error'] is None and results[0]['result']['new_links_added'] == 3
+    for index in (1, 2, 3):
+        assert results[index]['result'] is None and results[index]['error'].startswith('Invalid article')
+    assert results[1]['error'] == 'Invalid article: content: Field required'
+    assert results[2]['error'].startswith('Invalid article: max_links: Input should be a valid integer')
+
+
+def test_batch_stream_yields_a_line_per_article():
+    """Every NDJSON article gets a result line keyed by its id or line number."""
+    lines = [json.dumps({'id': 'buffet-pile', 'content': read_article('buffet-pile'), 'max_links': 2}),
+             json.dumps({'content': '<p>Inflation and bonds</p>', 'max_links': 1}),
+             '{"content": ']
+    response = client.post('/process/batch/stream', content='\n'.join(lines).encode('utf-8'),
+                           headers={'Content-Type': 'application/x-ndjson'})
+    assert response.status_code == 200
+    results = {line['id']: line for line in map(json.loads, response.text.splitlines())}
+    assert set(results) == {'buffet-pile', 1, 2}
+    assert results['buffet-pile']['result']['new_links_added'] == 2
+    assert results[1]['result']['new_links_added'] == 1
+    assert results[2]['error'].startswith('Invalid article: Invalid JSON')
+
+
+def make_zip(articles):
+    """Build a zip archive of (name, content) articles in memory."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in articles:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def make_tar(articles):
+    """Build a gzipped tar archive of (name, content) articles in memory."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, content in articles:
+            data = content.encode('utf-8')
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_upload_single_file_and_archives():
+    """A single file returns an ArticleResponse; archives are unpacked into a result per member."""
+    content = read_article('buffet-pile')
+    response = client.post('/upload?max_links=4', files={'file': ('buffet-pile.html', content.encode('utf-8'))})
+    assert response.status_code == 200 and response.json()['new_links_added'] == 4
+
+    articles = [('buffet-pile.html', content), ('policy-mix.html', read_article('policy-mix'))]
+    files = [('file', ('articles.zip', make_zip(articles))),
+             ('file', ('articles.tar.gz', make_tar(articles))),
+             ('file', ('broken.zip', b'not a zip archive'))]
+    response = client.post('/upload?max_links=4', files=files)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['succeeded'], body['failed']) == (4, 1)
+    names = [result['filename'] for result in body['results']]
+    assert names.count('buffet-pile.html') == names.count('policy-mix.html') == 2
+    broken = body['results'][-1]
+    assert broken['filename'] == 'broken.zip' and broken['error'].startswith('Invalid archive')
+
+
+def test_upload_over_limit_is_rejected():
+    """Uploads over the size limit are a 413, whether or not they declare their length."""
+    limit = api.MAX_UPLOAD_BYTES
+    api.MAX_UPLOAD_BYTES = 1024
+    data = make_zip([('buffet-pile.html', read_article('buffet-pile'))])
+    try:
+        response = client.post('/upload', files={'file': ('articles.zip', data)})
+        assert response.status_code == 413
+
+        boundary = 'article-boundary'
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="buffet-pile.html"\r\n'
+                f'Content-Type: text/html\r\n\r\n{read_article("buffet-pile")}\r\n--{boundary}--\r\n').encode('utf-8')
+        # A generator body is sent with chunked transfer encoding, without a Content-Length
+        response = client.post('/upload', content=(body[i:i + 512] for i in range(0, len(body), 512)),
+                               headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+        assert response.status_code == 413
+    finally:
+        api.MAX_UPLOAD_BYTES = limit
+
+
+def test_busy_executor_returns_503():
+    """Requests are rejected with 503 while the linking queue is full."""
+    executor = api.reloader.current
+    queue_depth = executor.queue_depth
+    # No call fits in the queue, so every request that needs a worker is rejected
+    executor.queue_depth = -executor.max_workers
+    try:
+        content = '<p>Bonds, equities and inflation while the queue is full.</p>'
+        assert client.post('/process', json={'content': content}).status_code == 503
+        assert client.post('/process/stream', json={'content': content}).status_code == 503
+        assert client.post('/analyze', json={'content': content}).status_code == 503
+        assert client.post('/upload', files={'file': ('busy.html', content.encode('utf-8'))}).status_code == 503
+    finally:
+        executor.queue_depth = queue_depth
+    assert client.post('/process', json={'content': content}).status_code == 200
+
+
+
+def test_admin_endpoints_need_the_configured_token():
+    """/admin endpoints are disabled without LINKER_ADMIN_TOKEN and need the token when it is set."""
+    token = api.ADMIN_TOKEN
+    alias = {'url': 'https://example.com/widget', 'alias': 'gizmo'}
+    try:
+        api.ADMIN_TOKEN = None
+        assert client.post('/admin/reload').status_code == 403
+        assert client.post('/admin/terms/aliases', json=alias, headers={'X-Admin-Token': ''}).status_code == 403
+
+        api.ADMIN_TOKEN = 'secret'
+        assert client.post('/admin/reload').status_code == 401
+        assert client.post('/admin/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 401
+        assert client.post('/admin/terms/aliases', json=alias).status_code == 401
+        assert client.delete('/admin/terms', params={'url': alias['url']}).status_code == 401
+    finally:
+        api.ADMIN_TOKEN = token
+
+
+def test_admin_edits_round_trip():
+    """Entries and aliases edited through /admin are linked at once, and unknown ones are a 404."""
+    directory, glossary_file = make_glossary_dir()
+    reloader = GlossaryReloader(LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1))
+    workers = reloader.current._workers
+    original = api.reloader, api.ADMIN_TOKEN
+    api.reloader, api.ADMIN_TOKEN = reloader, 'secret'
+    headers = {'X-Admin-Token': 'secret'}
+    widget = {'term': 'widget', 'url': 'https://example.com/widget', 'aliases': [], 'category': 'test'}
+
+    def linked(content):
+        return client.post('/process', json={'content': content}).json()['html_content']
+
+    try:
+        response = client.put('/admin/terms', json=widget, headers=headers)
+        assert response.status_code == 200 and response.json()['created'] is True
+        assert 'example.com/widget' in linked(CONTENT)
+
+        alias = {'url': widget['url'], 'alias': 'gizmo'}
+        response = client.post('/admin/terms/aliases', json=alias, headers=headers)
+        assert response.status_code == 200 and response.json()['entries'][0]['aliases'] == ['gizmo']
+        assert 'example.com/widget' in linked('<p>A gizmo for volatility.</p>')
+        assert client.delete('/admin/terms/aliases', params=alias, headers=headers).status_code == 200
+        assert client.delete('/admin/terms/aliases', params=alias, headers=headers).status_code == 404
+        assert 'example.com/widget' not in linked('<p>A gizmo for the desk.</p>')
+
+        response = client.delete('/admin/terms', params={'url': widget['url']}, headers=headers)
+        assert response.status_code == 200 and response.json()['entries'] == [widget]
+        assert 'example.com/widget' not in linked(CONTENT)
+        assert client.delete('/admin/terms', params={'url': widget['url']}, headers=headers).status_code == 404
+        assert client.put('/admin/terms', json={**widget, 'term': ' '}, headers=headers).status_code == 400
+
+        assert reloader.reloads == 4 and reloader.current._workers is workers
+    finally:
+        api.reloader, api.ADMIN_TOKEN = original
+        reloader.current.shutdown()
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    test_raw_body_matches_json_body()
+    test_raw_body_errors()
+    test_process_stream_blocks_join_to_patch_output()
+    test_process_stream_keeps_snapshot_until_finished()
+    test_batch_reports_errors_per_item()
+    test_batch_stream_yields_a_line_per_article()
+    test_upload_single_file_and_archives()
+    test_upload_over_limit_is_rejected()
+    test_busy_executor_returns_503()
+    test_admin_endpoints_need_the_configured_token()
+    test_admin_edits_round_trip()
+    print("✅ All API endpoint tests passed")
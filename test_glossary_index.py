@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled glossary index.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from compile_glossary import compile_glossary
+from enhanced_internal_linking import EnhancedInternalLinker
+from glossary_index import glossary_index_path, load_glossary_index
+from glossary_store import add_alias, put_entry, read_glossary, remove_entry, write_glossary
+from term_matcher import LayeredTermMatcher
+
+
+def make_glossary_dir():
+    """Copy the test glossary into a fresh directory."""
+    directory = tempfile.mkdtemp()
+    glossary_file = os.path.join(directory, 'glossary.json')
+    shutil.copy('test_glossary_terms.json', glossary_file)
+    return directory, glossary_file
+
+
+def test_compiled_index_matches_json():
+    """A linker loaded from the index behaves exactly like one built from the JSON."""
+    directory, glossary_file = make_glossary_dir()
+    try:
+        index_file = compile_glossary(glossary_file)
+        assert index_file == glossary_index_path(glossary_file)
+        assert load_glossary_index(index_file, glossary_file) is not None
+
+        expected = EnhancedInternalLinker(glossary_file, use_index=False)
+        linker = EnhancedInternalLinker(glossary_file)
+        assert linker.glossary_version == expected.glossary_version
+        assert list(linker.glossary_terms) == expected.glossary_terms
+        assert linker.term_to_url_map == expected.term_to_url_map
+        assert linker.term_entries == expected.term_entries
+        assert linker.terms_by_category == expected.terms_by_category
+        assert linker.get_categories() == expected.get_categories()
+        assert list(linker.term_table) == list(expected.term_table)
+        assert all(linker.term_table.ranks[term] == rank for term, rank in expected.term_table.ranks.items())
+        assert linker.get_term_entry('NO SUCH TERM') is None and 'no such term' not in linker.term_entries
+        with open('Articles/revenue', 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert list(linker.term_matcher.iter_matches(content.lower())) == \
+            list(expected.term_matcher.iter_matches(content.lower()))
+        assert linker.link_html(content, max_links=12) == expected.link_html(content, max_links=12)
+        assert linker.analyze_html(content) == expected.analyze_html(content)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_stale_or_corrupt_index_falls_back_to_json():
+    """An index compiled from an older glossary, or with a bad checksum, is ignored."""
+    directory, glossary_file = make_glossary_dir()
+    try:
+        index_file = compile_glossary(glossary_file)
+        with open(glossary_file, 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        terms.append({'term': 'widget', 'url': 'https://example.com/widget', 'aliases': [], 'category': 'test'})
+        with open(glossary_file, 'w', encoding='utf-8') as f:
+            json.dump(terms, f)
+        assert load_glossary_index(index_file, glossary_file) is None
+        assert 'widget' in EnhancedInternalLinker(glossary_file).term_to_url_map
+
+        index_file = compile_glossary(glossary_file)
+        with open(index_file, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 0xFF]))
+        assert load_glossary_index(index_file, glossary_file) is None
+        assert 'widget' in EnhancedInternalLinker(glossary_file).term_to_url_map
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_stale_index_is_base_for_changed_glossary():
+    """After entries are edited, the old index plus a delta links exactly like a linker built from JSON."""
+    directory, glossary_file = make_glossary_dir()
+    try:
+        compile_glossary(glossary_file)
+        base_terms = set(EnhancedInternalLinker(glossary_file).term_table.terms)
+        terms = read_glossary(glossary_file)
+        remove_entry(terms, terms[0]['url'])
+        add_alias(terms, terms[0]['url'], 'price swings')
+        put_entry(terms, {'term': 'inflation', 'url': 'https://example.com/inflation', 'aliases': ['cpi'],
+                          'category': 'test'})
+        write_glossary(glossary_file, terms)
+        assert load_glossary_index(glossary_index_path(glossary_file), glossary_file) is None
+
+        expected = EnhancedInternalLinker(glossary_file, use_index=False)
+        linker = EnhancedInternalLinker(glossary_file)
+        assert isinstance(linker.term_matcher, LayeredTermMatcher)
+        assert linker.index_delta == len(base_terms ^ set(expected.term_table.terms))
+        assert linker.glossary_version == expected.glossary_version
+        assert list(linker.term_table) == list(expected.term_table)
+        for path in ('Articles/revenue', 'Articles/etf'):
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            assert linker.link_html(content, max_links=12) == expected.link_html(content, max_links=12)
+            assert linker.analyze_html(content) == expected.analyze_html(content)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_compiled_index_matches_json()
+    test_stale_or_corrupt_index_falls_back_to_json()
+    test_stale_index_is_base_for_changed_glossary()
+    print("✅ All glossary index tests passed")
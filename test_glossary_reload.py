@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for hot reloading the glossary.
+"""
+
+import asyncio
+import json
+import shutil
+
+from compile_glossary import compile_glossary
+from enhanced_internal_linking import EnhancedInternalLinker
+from glossary_reload import GlossaryReloader, GlossaryReloadError
+from glossary_store import GlossaryEntryNotFoundError, add_alias, put_entry, read_glossary, remove_entry
+from linking_executor import LinkingExecutor
+from result_cache import ResultCache
+from test_glossary_index import make_glossary_dir
+
+CONTENT = '<p>Every widget has some volatility.</p>'
+
+
+def add_widget(glossary_file):
+    """Append a term to the glossary file."""
+    with open(glossary_file, 'r', encoding='utf-8') as f:
+        terms = json.load(f)
+    terms.append({'term': 'widget', 'url': 'https://example.com/widget', 'aliases': [], 'category': 'test'})
+    with open(glossary_file, 'w', encoding='utf-8') as f:
+        json.dump(terms, f)
+
+
+def test_reload_swaps_snapshot_after_in_flight_requests():
+    """A reload serves new requests from the new glossary while a held snapshot keeps the old one."""
+    directory, glossary_file = make_glossary_dir()
+    cache = ResultCache()
+    reloader = GlossaryReloader(LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1),
+                                result_cache=cache)
+    assert cache.glossary_version == reloader.linker.glossary_version
+
+    async def reload_during_request():
+        unchanged = await reloader.reload()
+        assert unchanged['reloaded'] is False
+
+        async with reloader.snapshot() as old:
+            add_widget(glossary_file)
+            result = await reloader.reload()
+            assert result['reloaded'] is True and result['previous_version'] == old.linker.glossary_version
+            assert reloader.current is not old
+            assert cache.glossary_version == result['glossary_version']
+            # The request holding the old snapshot still finishes on it
+            before = await old.link_html(CONTENT)
+        async with reloader.snapshot() as new:
+            after = await new.link_html(CONTENT)
+        # Once released, the retired snapshot's pool is shut down
+        try:
+            await old.link_html(CONTENT)
+            assert False, "retired snapshot should not accept work"
+        except RuntimeError:
+            pass
+        return result, before, after
+
+    try:
+        result, before, after = asyncio.run(reload_during_request())
+        assert reloader.linker.glossary_version == result['glossary_version'] != result['previous_version']
+        assert before.new_links_added == 1 and 'example.com/widget' not in before.html
+        assert after.new_links_added == 2 and 'example.com/widget' in after.html
+        assert reloader.get_statistics()['reloads'] == 1
+    finally:
+        reloader.current.shutdown()
+        shutil.rmtree(directory)
+
+
+def test_invalid_glossary_keeps_current_snapshot():
+    """A glossary that is not valid JSON is rejected and the running glossary stays in use."""
+    directory, glossary_file = make_glossary_dir()
+    executor = LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1)
+    reloader = GlossaryReloader(executor)
+    with open(glossary_file, 'a', encoding='utf-8') as f:
+        f.write(',')
+    try:
+        asyncio.run(reloader.reload())
+        assert False, "reload should fail"
+    except GlossaryReloadError:
+        pass
+    finally:
+        executor.shutdown()
+        shutil.rmtree(directory)
+    assert reloader.current is executor and reloader.reloads == 0
+
+
+def test_edits_are_persisted_and_compacted():
+    """Edits are written to the glossary file, served at once, and fold into a new index past the limit."""
+    directory, glossary_file = make_glossary_dir()
+    compile_glossary(glossary_file)
+    reloader = GlossaryReloader(LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1),
+                                max_index_delta=3)
+    widget = {'term': 'widget', 'url': 'https://example.com/widget', 'aliases': [], 'category': 'test'}
+
+    async def edit():
+        created, result = await reloader.edit_glossary(lambda terms: put_entry(terms, dict(widget)))
+        assert created and result['reloaded'] and result['index_delta'] == 1
+        async with reloader.snapshot() as executor:
+            assert 'example.com/widget' in (await executor.link_html(CONTENT)).html
+
+        _, result = await reloader.edit_glossary(lambda terms: add_alias(terms, widget['url'], 'gizmo'))
+        assert result['index_delta'] == 2
+        # The third changed term reaches the limit and the index is recompiled
+        _, result = await reloader.edit_glossary(lambda terms: add_alias(terms, widget['url'], 'doohickey'))
+        assert result['index_delta'] == 0
+
+        try:
+            await reloader.edit_glossary(lambda terms: remove_entry(terms, 'https://example.com/none'))
+            assert False, "removing a missing entry should fail"
+        except GlossaryEntryNotFoundError:
+            pass
+        return result
+
+    try:
+        result = asyncio.run(edit())
+        assert read_glossary(glossary_file)[-1]['aliases'] == ['gizmo', 'doohickey']
+        assert reloader.linker.glossary_version == result['glossary_version'] and reloader.reloads == 3
+        assert reloader.linker.index_delta == 0 and 'doohickey' in reloader.linker.term_to_url_map
+    finally:
+        reloader.current.shutdown()
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_reload_swaps_snapshot_after_in_flight_requests()
+    test_invalid_glossary_keeps_current_snapshot()
+    test_edits_are_persisted_and_compacted()
+    print("✅ All glossary reload tests passed")
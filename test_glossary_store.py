@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for glossary entry edits.
+"""
+
+import os
+import shutil
+import tempfile
+
+from enhanced_internal_linking import EnhancedInternalLinker
+from glossary_store import (GlossaryEntryNotFoundError, add_alias, find_entries, put_entry, read_glossary,
+                            remove_alias, remove_entry, write_glossary)
+
+ALGO_TRADING_URL = 'https://capital.com/en-int/learn/glossary/algorithmic-trading-definition'
+ABSOLUTE_RETURN_URL = 'https://capital.com/en-int/learn/glossary/absolute-return-funds-definition'
+
+
+def test_edits_apply_to_every_entry_for_a_url():
+    """The shipped glossary has pages with two entries; edits change both of them."""
+    terms = read_glossary('glossary_terms.json')
+    assert len(find_entries(terms, ALGO_TRADING_URL)) == len(find_entries(terms, ABSOLUTE_RETURN_URL)) == 2
+    size = len(terms)
+
+    entries = remove_alias(terms, ABSOLUTE_RETURN_URL, 'absolute return')
+    assert len(entries) == 2 and all('absolute return' not in [a.lower() for a in e['aliases']] for e in entries)
+    entries = add_alias(terms, ABSOLUTE_RETURN_URL, 'ABSOLUTE RETURN FUND')
+    assert sum(len(e['aliases']) for e in entries) == 8, "an alias one entry already has is not added"
+
+    replacement = {'term': 'algorithmic trading', 'url': ALGO_TRADING_URL, 'aliases': [], 'category': 'trading'}
+    assert put_entry(terms, replacement) is False
+    assert [terms[position] for position in find_entries(terms, ALGO_TRADING_URL)] == [replacement]
+    assert len(terms) == size - 1
+
+    removed = remove_entry(terms, ABSOLUTE_RETURN_URL)
+    assert len(removed) == 2 and not find_entries(terms, ABSOLUTE_RETURN_URL)
+    assert len(terms) == size - 3
+    try:
+        remove_alias(terms, ALGO_TRADING_URL, 'algo trading')
+        assert False, "removing an alias no entry has should fail"
+    except GlossaryEntryNotFoundError:
+        pass
+
+
+def test_removed_alias_is_no_longer_linked():
+    """An alias removed from a page with several entries stops being linked."""
+    directory = tempfile.mkdtemp()
+    glossary_file = os.path.join(directory, 'glossary_terms.json')
+    content = '<p>Many desks now rely on algo trading.</p>'
+    try:
+        terms = read_glossary('glossary_terms.json')
+        write_glossary(glossary_file, terms)
+        assert ALGO_TRADING_URL in EnhancedInternalLinker(glossary_file).link_html(content).html
+
+        remove_alias(terms, ALGO_TRADING_URL, 'Algo Trading')
+        write_glossary(glossary_file, terms)
+        assert ALGO_TRADING_URL not in EnhancedInternalLinker(glossary_file).link_html(content).html
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_edits_apply_to_every_entry_for_a_url()
+    test_removed_alias_is_no_longer_linked()
+    print("✅ All glossary store tests passed")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming HTML rewriter.
+"""
+
+import re
+
+from enhanced_internal_linking import EnhancedInternalLinker
+from html_rewriter import BLOCK_TAGS, LinkEdit, StreamingLinkRewriter, apply_link_edits, count_links
+from test_parser_conformance import corpus_files, link_sequence
+
+INSERTED_ANCHOR = re.compile(r'<a href="[^"]*">(.*)</a>', re.DOTALL)
+
+
+def rewrite(linker, content, chunk_size, **kwargs):
+    """Feed content to a rewriter in fixed-size chunks and return the written pieces."""
+    pieces = []
+    rewriter = StreamingLinkRewriter(linker, pieces.append, **kwargs)
+    for start in range(0, len(content), chunk_size):
+        rewriter.feed(content[start:start + chunk_size])
+    rewriter.close()
+    return rewriter, pieces
+
+
+def test_streaming_links_corpus_like_link_html():
+    """Streamed output has the same links as the tree-based linker, for any chunk size."""
+    linker = EnhancedInternalLinker()
+    for path in corpus_files():
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for max_links in (2, 12, 40):
+            expected = linker.link_html(content, max_links=max_links)
+            for chunk_size in (7, 4096):
+                chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+                pieces = []
+                result = linker.link_html_stream(chunks, pieces.append, max_links=max_links,
+                                                 existing_links=expected.existing_links)
+                assert result.new_links_added == expected.new_links_added, (path, max_links, chunk_size)
+                assert link_sequence(''.join(pieces)) == link_sequence(expected.html), (path, max_links, chunk_size)
+
+
+def test_source_outside_anchors_is_unchanged():
+    """Removing the inserted anchors gives back the input exactly, also when long runs are split."""
+    linker = EnhancedInternalLinker()
+    for path in corpus_files():
+        with open(path, 'r', encoding='utf-8') as f:
+            content = linker._strip_current_url_directive(f.read())
+        rewriter, pieces = rewrite(linker, content, 13, max_links=40, existing_links=count_links([content]),
+                                   max_run_chars=200)
+        inserted = [INSERTED_ANCHOR.fullmatch(piece) for piece in pieces]
+        source = ''.join(match.group(1) if match else piece for match, piece in zip(inserted, pieces))
+        assert source == content, path
+        assert sum(1 for match in inserted if match) == rewriter.new_links_added
+
+
+def test_entities_and_excluded_elements():
+    """Terms are matched across entities and never linked inside scripts or anchors."""
+    linker = EnhancedInternalLinker()
+    content = ('<p>The S&amp;P 500 <script>var inflation = 1;</script> and '
+               '<a href="/x"><b>bonds</b></a> beat inflation</p>')
+    rewriter, pieces = rewrite(linker, content, 5)
+    html = ''.join(pieces)
+    assert '>S&amp;P 500</a>' in html
+    assert '<script>var inflation = 1;</script>' in html
+    assert '<a href="/x"><b>bonds</b></a>' in html
+    assert html.endswith('>inflation</a></p>')
+    assert (rewriter.existing_links, rewriter.new_links_added) == (1, 2)
+
+
+def test_streaming_file_mode():
+    """create_html_links(streaming=True) counts existing links up front and honours the directive."""
+    linker = EnhancedInternalLinker()
+    for path in ('Articles/revenue', 'Articles/maturity'):
+        expected = linker.create_html_links(path, max_links=12)
+        result = linker.create_html_links(path, max_links=12, streaming=True)
+        assert (result.existing_links, result.new_links_added) == (expected.existing_links, expected.new_links_added)
+        assert link_sequence(result.html) == link_sequence(expected.html)
+
+
+def test_apply_link_edits():
+    """Edits are applied in one pass and escape the href."""
+    source = 'Fees &amp; <i>inflation</i> data'
+    edits = [LinkEdit(0, 4, '/fees?a=1&b=2', 'fees'), LinkEdit(14, 9, '/inflation', 'inflation')]
+    assert apply_link_edits(source, edits) == \
+        '<a href="/fees?a=1&amp;b=2">Fees</a> &amp; <i><a href="/inflation">inflation</a></i> data'
+    assert apply_link_edits(source, []) == source
+
+
+def test_patch_output_matches_tree_output():
+    """Patch mode adds the same links as tree mode and leaves the rest of the source untouched."""
+    linker = EnhancedInternalLinker()
+    for path in corpus_files():
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        for max_links in (2, 12, 40):
+            expected = linker.link_html(content, max_links=max_links)
+            result = linker.link_html(content, max_links=max_links, output='patch')
+            assert result.new_links_added == expected.new_links_added, (path, max_links)
+            assert link_sequence(result.html) == link_sequence(expected.html), (path, max_links)
+
+            found = linker.find_link_edits(content, max_links=max_links)
+            assert found.html is None and found.new_links_added == len(found.edits)
+            # Offsets refer to the content as given, directive line included
+            assert [content[edit.offset:edit.end] for edit in found.edits] == \
+                [text for href, text in link_sequence(result.html) if (href, text) not in link_sequence(content)]
+
+
+def test_tree_mode_skips_excluded_elements_like_patch_mode():
+    """Tree mode leaves scripts, styles, titles and comments alone, as patch mode does."""
+    linker = EnhancedInternalLinker()
+    content = ('<!DOCTYPE html><html><head><title>Inflation</title>'
+               '<style>.inflation { color: red; }</style></head><body>'
+               '<script>var inflation = 1;</script><!-- inflation -->'
+               '<textarea>inflation</textarea><p>Bonds and inflation</p></body></html>')
+    tree = linker.link_html(content, max_links=10)
+    patch = linker.link_html(content, max_links=10, output='patch')
+    assert tree.new_links_added == patch.new_links_added == 2
+    assert link_sequence(tree.html) == link_sequence(patch.html)
+    assert '<!-- inflation -->' in tree.html and '<script>var inflation = 1;</script>' in tree.html
+    assert '<title>Inflation</title>' in tree.html
+
+
+def test_current_url_directive_is_read_alike_in_every_mode():
+    """Tree, patch and streaming output all honour a leading directive and only a leading one."""
+    linker = EnhancedInternalLinker()
+    url = 'https://capital.com/en-int/learn/glossary/inflation-definition'
+    body = '<p>Inflation and bonds</p>'
+    for content, self_linked in (('{current_url = "%s/"}\n%s' % (url, body), False),
+                                 ('%s\n<p>{current_url = "%s"}</p>' % (body, url), True)):
+        tree = linker.link_html(content)
+        patch = linker.link_html(content, output='patch')
+        pieces = []
+        streamed = linker.link_html_stream([content], pieces.append)
+        for html in (tree.html, patch.html, ''.join(pieces)):
+            assert ('href="%s"' % url in html) == self_linked, (content, html)
+        assert tree.new_links_added == patch.new_links_added == streamed.new_links_added
+
+
+def test_blocks_join_to_patch_output():
+    """link_html_blocks emits the patch-mode output, cut before block-level start tags."""
+    linker = EnhancedInternalLinker()
+    for path in corpus_files():
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        expected = linker.link_html(content, max_links=12, output='patch')
+        blocks = []
+        result = linker.link_html_blocks(content, blocks.append, max_links=12)
+        assert ''.join(blocks) == expected.html, path
+        assert (result.existing_links, result.new_links_added) == (expected.existing_links, expected.new_links_added)
+        for block in blocks[1:]:
+            assert re.match(r'<([a-z0-9]+)', block).group(1) in BLOCK_TAGS, (path, block[:40])
+
+
+if __name__ == "__main__":
+    test_streaming_links_corpus_like_link_html()
+    test_source_outside_anchors_is_unchanged()
+    test_entities_and_excluded_elements()
+    test_streaming_file_mode()
+    test_apply_link_edits()
+    test_patch_output_matches_tree_output()
+    test_tree_mode_skips_excluded_elements_like_patch_mode()
+    test_current_url_directive_is_read_alike_in_every_mode()
+    test_blocks_join_to_patch_output()
+    print("✅ All HTML rewriter tests passed")
@@ -33,11 +33,13 @@ def test_link_counting():
         temp_file = f.name
     
     try:
-        html_output = linker.create_html_links(temp_file, max_links=12)
+        result = linker.create_html_links(temp_file, max_links=12)
         
         # Count total links in output
-        output_soup = BeautifulSoup(html_output, 'html.parser')
+        output_soup = BeautifulSoup(result.html, 'html.parser')
         total_links = output_soup.find_all('a')
+        assert len(total_links) == result.total_links
+        assert result.existing_links == len(existing_links)
         
         print(f"\nOutput has {len(total_links)} total links:")
         for i, link in enumerate(total_links, 1):
@@ -69,5 +71,30 @@ def test_link_counting():
     finally:
         os.unlink(temp_file)
 
+def test_existing_links_use_source_positions():
+    """Terms inside existing anchors are skipped at the anchor's own position, not the first textual match."""
+    linker = EnhancedInternalLinker()
+    content = ('<p>Inflation is high.</p>\n'
+               '<p>See <a href="/inflation-definition">Inflation</a> and <a href="/x"><b>interest rates</b></a>.</p>')
+    matches = {term: start for term, _, start, _ in linker.find_matches(content)}
+    # The first "Inflation" is plain text and links; nothing inside or on the anchors does
+    assert matches['inflation'] == 3
+    assert 'interest rates' not in matches
+    
+    result = linker.link_html(content, max_links=12)
+    soup = BeautifulSoup(result.html, 'html.parser')
+    assert result.existing_links == 2
+    assert not soup.select('a a')
+
+def test_existing_link_span_ends_at_closing_anchor():
+    """Closing tags that start with </a, such as </abbr>, do not end an existing link early."""
+    linker = EnhancedInternalLinker()
+    content = '<p><a href="/x"><abbr>CPI</abbr> and interest rates</a> then inflation</p>'
+    matches = {term for term, _, _, _ in linker.find_matches(content)}
+    assert 'interest rates' not in matches
+    assert 'inflation' in matches
+
 if __name__ == "__main__":
-    test_link_counting() 
\ No newline at end of file
+    test_link_counting()
+    test_existing_links_use_source_positions()
+    test_existing_link_span_ends_at_closing_anchor() 
\ No newline at end of file
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for the linking executor.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+
+from enhanced_internal_linking import EnhancedInternalLinker
+from linking_executor import LinkingExecutor, ExecutorBusyError
+from test_glossary_index import make_glossary_dir
+from test_glossary_reload import CONTENT, add_widget
+
+
+def test_link_html_runs_on_worker():
+    """Linking through the executor gives the same result as calling the linker directly."""
+    linker = EnhancedInternalLinker()
+    executor = LinkingExecutor(linker, max_workers=2)
+    with open('Articles/policy-mix', 'r', encoding='utf-8') as f:
+        content = f.read()
+    try:
+        result = asyncio.run(executor.link_html(content, max_links=5))
+    finally:
+        executor.shutdown()
+    assert result == linker.link_html(content, max_links=5)
+
+
+def test_full_queue_rejects_requests():
+    """Calls beyond the workers plus the queue depth are rejected instead of queued."""
+    executor = LinkingExecutor(EnhancedInternalLinker(), max_workers=1, queue_depth=1)
+
+    async def submit_three():
+        calls = [executor.run(time.sleep, 0.2) for _ in range(3)]
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    try:
+        results = asyncio.run(submit_three())
+    finally:
+        executor.shutdown()
+    assert results[:2] == [None, None]
+    assert isinstance(results[2], ExecutorBusyError)
+
+
+
+def test_process_backend_links_in_worker_processes():
+    """Worker processes build their own linker and return the same result."""
+    linker = EnhancedInternalLinker()
+    executor = LinkingExecutor(linker, max_workers=2, backend='process')
+    with open('Articles/etf', 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    async def link_after_warm_up():
+        await executor.warm_up()
+        return await executor.link_html(content, max_links=30)
+
+    try:
+        result = asyncio.run(link_after_warm_up())
+    finally:
+        executor.shutdown()
+    assert result == linker.link_html(content, max_links=30)
+
+
+
+def test_with_linker_shares_workers():
+    """An executor for a new glossary reuses the worker threads, which stop with the last executor."""
+    directory, glossary_file = make_glossary_dir()
+    executor = LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1)
+    try:
+        thread = asyncio.run(executor.run(threading.get_ident))
+        add_widget(glossary_file)
+        new = executor.with_linker(EnhancedInternalLinker(glossary_file))
+        executor.shutdown()
+        assert asyncio.run(new.run(threading.get_ident)) == thread
+        assert asyncio.run(new.link_html(CONTENT)).new_links_added == 2
+        try:
+            asyncio.run(executor.link_html(CONTENT))
+            assert False, "a shut down executor should not accept work"
+        except RuntimeError:
+            pass
+        new.shutdown()
+        assert thread not in {alive.ident for alive in threading.enumerate()}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_process_workers_load_new_glossary_version():
+    """Worker processes serve the new glossary after with_linker without being restarted."""
+    directory, glossary_file = make_glossary_dir()
+    executor = LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1, backend='process')
+
+    async def link_before_and_after_edit():
+        before = await executor.link_html(CONTENT)
+        pid = await executor.run(os.getpid)
+        add_widget(glossary_file)
+        new = executor.with_linker(EnhancedInternalLinker(glossary_file))
+        await new.warm_up()
+        after = await new.link_html(CONTENT)
+        # The previous snapshot still links with the glossary it was created for
+        old = await executor.link_html(CONTENT)
+        executor.shutdown()
+        return before, after, old, pid == await new.run(os.getpid), new
+
+    new = None
+    try:
+        before, after, old, same_worker, new = asyncio.run(link_before_and_after_edit())
+    finally:
+        (new or executor).shutdown()
+        shutil.rmtree(directory)
+    assert same_worker
+    assert (before.new_links_added, after.new_links_added, old.new_links_added) == (1, 2, 1)
+    assert 'example.com/widget' in after.html
+
+
+def test_process_workers_never_link_old_snapshot_with_newer_glossary():
+    """A worker that has dropped or never loaded a snapshot's version loads that version, not the file on disk."""
+    directory, glossary_file = make_glossary_dir()
+    first = LinkingExecutor(EnhancedInternalLinker(glossary_file), max_workers=1, backend='process')
+    snapshot_dir = first._workers.snapshot_dir
+
+    async def link_oldest_after_two_edits():
+        add_widget(glossary_file)
+        second = first.with_linker(EnhancedInternalLinker(glossary_file))
+        with open(glossary_file, 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        terms[-1]['url'] = 'https://example.com/gadget'
+        with open(glossary_file, 'w', encoding='utf-8') as f:
+            json.dump(terms, f)
+        third = second.with_linker(EnhancedInternalLinker(glossary_file))
+        # The worker keeps linkers for the last two versions it used, dropping the first
+        await second.warm_up()
+        await third.warm_up()
+        results = [await executor.link_html(CONTENT) for executor in (first, second, third)]
+        second.shutdown()
+        third.shutdown()
+        return results
+
+    try:
+        oldest, widget, gadget = asyncio.run(link_oldest_after_two_edits())
+    finally:
+        first.shutdown()
+        shutil.rmtree(directory)
+    assert 'example.com' not in oldest.html and oldest.new_links_added == 1
+    assert 'example.com/widget' in widget.html and 'example.com/gadget' in gadget.html
+    assert not os.path.exists(snapshot_dir)
+
+if __name__ == "__main__":
+    test_link_html_runs_on_worker()
+    test_full_queue_rejects_requests()
+    test_process_backend_links_in_worker_processes()
+    test_with_linker_shares_workers()
+    test_process_workers_load_new_glossary_version()
+    test_process_workers_never_link_old_snapshot_with_newer_glossary()
+    print("✅ All linking executor tests passed")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for HTML parser backend conformance.
+
+Links the Articles/ corpus and the saved *-links.html outputs with every
+installed parser backend and checks that each one produces the same links as
+html.parser.
+"""
+
+import glob
+import os
+
+from bs4 import BeautifulSoup
+
+from enhanced_internal_linking import EnhancedInternalLinker
+from html_parsers import available_parsers, parse_html, resolve_parser
+
+
+def corpus_files():
+    """Article inputs and previously linked outputs."""
+    articles = [path for path in sorted(glob.glob('Articles/*')) if os.path.isfile(path)]
+    return articles + sorted(glob.glob('*-links.html'))
+
+
+def link_sequence(html):
+    """(href, text) of every anchor in document order."""
+    soup = BeautifulSoup(html, 'html.parser')
+    return [(link.get('href'), link.get_text()) for link in soup.find_all('a')]
+
+
+def test_resolve_parser_rejects_unknown_backends():
+    """Unknown and non-HTML builders are rejected when the linker is created."""
+    assert resolve_parser(None) == 'html.parser'
+    assert 'html.parser' in available_parsers()
+    for name in ('no-such-parser', 'xml', 'html5lib'):
+        try:
+            resolve_parser(name)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{name} should be rejected")
+
+
+def test_fragments_are_not_wrapped():
+    """Document wrappers added by a backend are removed from fragments only."""
+    for parser in available_parsers():
+        assert str(parse_html('Plain <b>text</b>', parser)) == 'Plain <b>text</b>'
+        assert parse_html('<html><body><p>x</p></body></html>', parser).body is not None
+
+
+def test_backends_link_corpus_like_html_parser():
+    """Every backend adds and counts the same links as html.parser across the corpus."""
+    reference = EnhancedInternalLinker(parser='html.parser')
+    for parser in available_parsers():
+        if parser == 'html.parser':
+            continue
+        linker = EnhancedInternalLinker(parser=parser)
+        for path in corpus_files():
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            for max_links in (2, 12, 40):
+                expected = reference.link_html(content, max_links=max_links)
+                actual = linker.link_html(content, max_links=max_links)
+                assert (actual.existing_links, actual.new_links_added) == \
+                    (expected.existing_links, expected.new_links_added), (parser, path, max_links)
+                assert link_sequence(actual.html) == link_sequence(expected.html), (parser, path, max_links)
+            assert linker.find_matches(content) == reference.find_matches(content), (parser, path)
+
+
+if __name__ == "__main__":
+    test_resolve_parser_rejects_unknown_backends()
+    test_fragments_are_not_wrapped()
+    test_backends_link_corpus_like_html_parser()
+    print("✅ All parser conformance tests passed")
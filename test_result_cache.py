@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the linking result cache.
+"""
+
+from result_cache import ResultCache
+
+
+def test_key_depends_on_content_options_and_glossary():
+    """Changing the content, an option or the glossary version changes the key."""
+    key = ResultCache.make_key('process', '<p>ETF</p>', 'v1', max_links=12, current_url=None)
+    assert key == ResultCache.make_key('process', '<p>ETF</p>', 'v1', current_url=None, max_links=12)
+    assert key != ResultCache.make_key('process', '<p>ETFs</p>', 'v1', max_links=12, current_url=None)
+    assert key != ResultCache.make_key('process', '<p>ETF</p>', 'v1', max_links=5, current_url=None)
+    assert key != ResultCache.make_key('process', '<p>ETF</p>', 'v2', max_links=12, current_url=None)
+    assert key != ResultCache.make_key('analyze', '<p>ETF</p>', 'v1', max_links=12, current_url=None)
+
+
+def test_lru_eviction_by_entries_and_size():
+    """Least recently used entries are evicted first once a limit is exceeded."""
+    cache = ResultCache(max_entries=2, max_bytes=100)
+    cache.set_glossary_version('v1')
+    cache.put('a', 'A', 10, 'v1')
+    cache.put('b', 'B', 10, 'v1')
+    assert cache.get('a', 'v1') == 'A'
+    cache.put('c', 'C', 10, 'v1')
+    assert cache.get('b', 'v1') is None
+    assert cache.get('a', 'v1') == 'A'
+    cache.put('d', 'D', 95, 'v1')
+    assert cache.get('a', 'v1') is None
+    assert cache.get('d', 'v1') == 'D'
+    stats = cache.get_statistics()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (3, 2, 3)
+
+
+def test_glossary_change_invalidates_entries():
+    """Moving to a new glossary version drops everything cached for the old one."""
+    cache = ResultCache()
+    cache.set_glossary_version('v1')
+    cache.put('a', 'A', 10, 'v1')
+    cache.set_glossary_version('v2')
+    assert cache.get('a', 'v2') is None
+    assert cache.get_statistics()['entries'] == 0
+
+
+def test_stale_version_bypasses_cache():
+    """Requests still running on an old glossary neither see nor drop results for the new one."""
+    cache = ResultCache()
+    cache.set_glossary_version('v1')
+    cache.put('a', 'A1', 10, 'v1')
+    cache.set_glossary_version('v2')
+    cache.put('a', 'A2', 10, 'v2')
+    assert cache.get('a', 'v1') is None
+    cache.put('b', 'B1', 10, 'v1')
+    assert cache.get('b', 'v1') is None
+    assert cache.get('a', 'v2') == 'A2'
+    stats = cache.get_statistics()
+    assert (stats['entries'], stats['glossary_version']) == (1, 'v2')
+
+
+if __name__ == "__main__":
+    test_key_depends_on_content_options_and_glossary()
+    test_lru_eviction_by_entries_and_size()
+    test_glossary_change_invalidates_entries()
+    test_stale_version_bypasses_cache()
+    print("✅ All result cache tests passed")
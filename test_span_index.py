@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the span overlap index.
+"""
+
+import random
+
+from span_index import SpanIndex, SpanSet, select_non_overlapping
+
+
+def linear_overlaps(spans, start, end):
+    """Reference overlap check: scan every span."""
+    return any(start < span_end and end > span_start for span_start, span_end in spans)
+
+
+def test_span_index_agrees_with_linear_scan():
+    """Overlapping and nested spans are handled like the linear scan."""
+    rng = random.Random(3)
+    for _ in range(50):
+        spans = []
+        for _ in range(rng.randint(0, 30)):
+            start = rng.randint(0, 200)
+            spans.append((start, start + rng.randint(1, 40)))
+        index = SpanIndex(spans)
+        for _ in range(50):
+            start = rng.randint(0, 240)
+            end = start + rng.randint(1, 20)
+            assert index.overlaps(start, end) == linear_overlaps(spans, start, end)
+
+
+def test_span_set_tracks_added_spans():
+    """Adjacent spans do not overlap; any shared position does."""
+    selected = SpanSet()
+    selected.add(10, 20)
+    selected.add(30, 35)
+    assert not selected.overlaps(0, 10)
+    assert not selected.overlaps(20, 30)
+    assert selected.overlaps(19, 21)
+    assert selected.overlaps(5, 40)
+    assert selected.overlaps(31, 32)
+    assert len(selected) == 2
+
+
+def set_based_selection(matches):
+    """Reference selection: mark every covered position in a set."""
+    selected = []
+    occupied = set()
+    for match in sorted(matches, key=lambda m: (-m['length'], m['start'])):
+        positions = set(range(match['start'], match['end']))
+        if occupied & positions:
+            continue
+        selected.append(match)
+        occupied.update(positions)
+    return sorted(selected, key=lambda m: m['start'])
+
+
+def test_selection_agrees_with_set_based_selection():
+    """Longest-then-earliest selection is unchanged, and the limit keeps the preferred matches."""
+    rng = random.Random(5)
+    for _ in range(100):
+        matches = []
+        for _ in range(rng.randint(0, 40)):
+            start = rng.randint(0, 300)
+            length = rng.randint(1, 30)
+            matches.append({'start': start, 'end': start + length, 'length': length})
+        expected = set_based_selection(matches)
+        assert select_non_overlapping(matches) == expected
+        limited = select_non_overlapping(matches, limit=3)
+        preferred = sorted(expected, key=lambda m: (-m['length'], m['start']))[:3]
+        assert limited == sorted(preferred, key=lambda m: m['start'])
+    assert select_non_overlapping(matches, limit=0) == []
+
+
+if __name__ == "__main__":
+    test_span_index_agrees_with_linear_scan()
+    test_span_set_tracks_added_spans()
+    test_selection_agrees_with_set_based_selection()
+    print("✅ All span index tests passed")
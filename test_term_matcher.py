@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the Aho-Corasick term matcher.
+"""
+
+import random
+
+from term_matcher import AhoCorasickMatcher, LayeredTermMatcher, TermTable
+from enhanced_internal_linking import EnhancedInternalLinker
+
+
+def naive_occurrences(text, terms):
+    """Find every (start, end, term_index) occurrence with str.find."""
+    found = []
+    for term_index, term in enumerate(terms):
+        start = text.find(term)
+        while start != -1:
+            found.append((start, start + len(term), term_index))
+            start = text.find(term, start + 1)
+    return sorted(found)
+
+
+def test_matches_agree_with_naive_search():
+    """Every occurrence, including overlapping ones, is reported."""
+    terms = ['he', 'she', 'his', 'hers', 'interest rate', 'interest rates', 'rate', 's&p 500']
+    matcher = AhoCorasickMatcher(terms)
+    text = 'ushers say she has his interest rates at the s&p 500 rate'
+    assert sorted(matcher.iter_matches(text)) == naive_occurrences(text, terms)
+
+
+def test_random_texts_agree_with_naive_search():
+    """Randomised check over a small alphabet to exercise failure links, also for the dense tables."""
+    rng = random.Random(7)
+    terms = sorted({''.join(rng.choice('ab ') for _ in range(rng.randint(1, 5))) for _ in range(40)})
+    matcher = AhoCorasickMatcher(terms)
+    dense = matcher.to_dense()
+    for _ in range(200):
+        text = ''.join(rng.choice('ab c') for _ in range(rng.randint(0, 60)))
+        assert sorted(matcher.iter_matches(text)) == naive_occurrences(text, terms)
+        assert list(dense.iter_matches(text)) == list(matcher.iter_matches(text))
+
+
+def test_layered_matcher_agrees_with_rebuilt_matcher():
+    """A base matcher plus a delta for added and removed terms reports what a full rebuild reports."""
+    rng = random.Random(11)
+    base_terms = {''.join(rng.choice('ab ') for _ in range(rng.randint(1, 5))): 'u' for _ in range(40)}
+    base = AhoCorasickMatcher(TermTable(base_terms).terms).to_dense()
+    for _ in range(20):
+        terms = {term: url for term, url in base_terms.items() if rng.random() > 0.2}
+        terms.update((''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))), 'v') for _ in range(5))
+        table = TermTable(terms)
+        layered = LayeredTermMatcher(table, base)
+        rebuilt = AhoCorasickMatcher(table.terms)
+        assert layered.added_terms == len(set(terms) - set(base_terms))
+        assert layered.removed_terms == len(set(base_terms) - set(terms))
+        for _ in range(20):
+            text = ''.join(rng.choice('ab c') for _ in range(rng.randint(0, 60)))
+            assert sorted(layered.iter_matches(text)) == sorted(rebuilt.iter_matches(text))
+            assert [end for _, end, _ in layered.iter_matches(text)] == sorted(end for _, end, _ in rebuilt.iter_matches(text))
+            assert layered.find_occurrences(text) == rebuilt.find_occurrences(text)
+
+
+def test_term_table_is_length_ordered_and_immutable():
+    """Longest terms come first, ties keep glossary order, and the table cannot be modified."""
+    table = TermTable({'etf': 'u1', 'bond': 'u2', 'fund': 'u3', 'bond yield': 'u2'})
+    assert table.terms == ('bond yield', 'bond', 'fund', 'etf')
+    assert table.urls == ('u2', 'u2', 'u3', 'u1')
+    assert table.ranks['fund'] == 2
+    try:
+        table.terms = ()
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("TermTable should be immutable")
+
+
+def test_linker_keeps_longest_first_and_whole_word():
+    """The linker prefers longer terms, links each URL once and skips partial words."""
+    linker = EnhancedInternalLinker()
+    text = 'Interest rates move. Rates matter. Preinflation is not inflation, and inflation repeats.'
+    matches = linker.find_matches(text)
+    urls = [url for _, url, _, _ in matches]
+    assert len(urls) == len(set(urls))
+    terms = {term: (start, end) for term, _, start, end in matches}
+    assert 'interest rates' in terms
+    assert 'inflation' in terms
+    start, end = terms['inflation']
+    assert text[start:end] == 'inflation'
+    assert start == text.index('not inflation') + len('not ')
+
+
+
+def test_document_scan_respects_node_boundaries():
+    """A term split across two text nodes is not matched."""
+    linker = EnhancedInternalLinker()
+    node_occurrences = linker._find_document_occurrences(['Moderate interest', 'rates and inflation'])
+    terms = linker.term_table.terms
+    assert 'interest rates' not in {terms[index] for index in node_occurrences[0]}
+    assert 'interest rates' not in {terms[index] for index in node_occurrences[1]}
+    inflation = linker.term_table.ranks['inflation']
+    assert node_occurrences[1][inflation] == [len('rates and ')]
+
+
+def test_whole_document_mode_matches_per_node_mode():
+    """Single-pass matching links the same terms as matching each node separately."""
+    linker = EnhancedInternalLinker()
+    for article in ('Articles/policy-mix', 'Articles/etf', 'Articles/revenue'):
+        for max_links in (2, 12, 40):
+            assert linker.create_html_links(article, max_links=max_links) == \
+                linker.create_html_links(article, max_links=max_links, whole_document=False)
+
+
+if __name__ == "__main__":
+    test_matches_agree_with_naive_search()
+    test_random_texts_agree_with_naive_search()
+    test_layered_matcher_agrees_with_rebuilt_matcher()
+    test_term_table_is_length_ordered_and_immutable()
+    test_linker_keeps_longest_first_and_whole_word()
+    test_document_scan_respects_node_boundaries()
+    test_whole_document_mode_matches_per_node_mode()
+    print("✅ All term matcher tests passed")